@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = "core"
     verbose_name = "основа"
+
+    def ready(self) -> None:
+        from core.db import (
+            check_connections,
+            configure_sqlite,
+            count_connection,
+        )
+
+        connection_created.connect(configure_sqlite)
+        connection_created.connect(count_connection)
+        request_started.connect(check_connections)
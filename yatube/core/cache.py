@@ -0,0 +1,258 @@
+import asyncio
+import time
+from calendar import timegm
+from datetime import datetime
+from functools import wraps
+from hashlib import md5
+from typing import Any, Callable, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from django.views.decorators.http import condition
+
+from core import executor, metrics, routers, thumbnails
+
+
+def _generation_key(namespace: str) -> str:
+    return f"generation:{namespace}"
+
+
+def get_generation(namespace: str) -> int:
+    key = _generation_key(namespace)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def _bump(namespace: str) -> None:
+    try:
+        cache.incr(_generation_key(namespace))
+    except ValueError:
+        cache.add(_generation_key(namespace), time.time_ns(), None)
+
+
+def bump_generation(namespace: str) -> None:
+    """Делает устаревшими все страницы, закэшированные в namespace.
+
+    Поколение поднимается сразу и ещё раз после фиксации транзакции:
+    страница, которую параллельный запрос успел отрендерить по ещё не
+    зафиксированным данным, остаётся под промежуточным поколением. Если
+    счётчик вытеснен из кэша, он стартует с текущего времени, чтобы не
+    совпасть ни с одним из прежних поколений.
+    """
+    _bump(namespace)
+    transaction.on_commit(lambda: _bump(namespace))
+
+
+def _page_key(
+    view: Callable,
+    namespace: str,
+    request: HttpRequest,
+    args: tuple,
+    kwargs: dict,
+) -> Optional[str]:
+    if request.method != "GET" or request.user.is_authenticated:
+        return None
+    return "page:{}:{}:{}".format(
+        view.__name__,
+        get_generation(namespace),
+        md5(
+            repr(
+                (
+                    args,
+                    sorted(kwargs.items()),
+                    request.GET.urlencode(),
+                ),
+            ).encode(),
+        ).hexdigest(),
+    )
+
+
+def _lookup(key: str) -> Optional[HttpResponse]:
+    response = cache.get(key)
+    metrics.cache_access(response is not None, response is None)
+    return response
+
+
+def _revalidate(request: HttpRequest, response: HttpResponse) -> HttpResponse:
+    """Отвечает 304 по ETag и Last-Modified ответа из кэша."""
+    last_modified = response.get("Last-Modified")
+    return get_conditional_response(
+        request,
+        etag=response.get("ETag"),
+        last_modified=last_modified and parse_http_date_safe(last_modified),
+        response=response,
+    )
+
+
+def _store(key: str, response: HttpResponse, timeout: Optional[int]) -> None:
+    if response.status_code == 200 and not response.cookies:
+        cache.set(
+            key,
+            response,
+            settings.PAGE_CACHE_TIMEOUT if timeout is None else timeout,
+        )
+
+
+def cache_anonymous_page(
+    namespace: str,
+    timeout: Optional[int] = None,
+) -> Callable:
+    """Кэширует ответ представления для анонимных GET-запросов.
+
+    Ключ строится из имени представления, его аргументов, строки запроса
+    и текущего поколения namespace. Страница с оригиналом вместо ещё не
+    готовой миниатюры не кэшируется, а при промахе представление читает
+    с основной базы: отставшая реплика не попадает в общий кэш под
+    новым поколением. Асинхронные представления
+    обращаются к сессии и кэшу через ``core.executor``.
+    """
+
+    def decorator(view: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(view):
+
+            @wraps(view)
+            async def async_wrapper(
+                request: HttpRequest,
+                *args,
+                **kwargs,
+            ) -> HttpResponse:
+                key = await executor.run(
+                    _page_key,
+                    view,
+                    namespace,
+                    request,
+                    args,
+                    kwargs,
+                )
+                if key is None:
+                    return await view(request, *args, **kwargs)
+                response = await executor.run(_lookup, key)
+                if response is not None:
+                    return _revalidate(request, response)
+                with routers.primary():
+                    with thumbnails.track_fallbacks() as fallbacks:
+                        response = await view(request, *args, **kwargs)
+                if not fallbacks:
+                    await executor.run(_store, key, response, timeout)
+                return response
+
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            key = _page_key(view, namespace, request, args, kwargs)
+            if key is None:
+                return view(request, *args, **kwargs)
+            response = _lookup(key)
+            if response is not None:
+                return _revalidate(request, response)
+            with routers.primary():
+                with thumbnails.track_fallbacks() as fallbacks:
+                    response = view(request, *args, **kwargs)
+            if not fallbacks:
+                _store(key, response, timeout)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+PageState = Tuple[Optional[datetime], Any]
+
+
+def conditional_page(changed: Callable[..., PageState]) -> Callable:
+    """Отвечает 304 до выборки постов и рендеринга шаблона.
+
+    ``changed`` вызывается с аргументами представления и одним дешёвым
+    запросом возвращает время последнего изменения страницы и всё
+    прочее, от чего зависит её содержимое. Из этого строятся
+    Last-Modified и ETag; в ETag входят ещё пользователь и строка
+    запроса, потому что вошедший пользователь видит другую страницу.
+    Страница с оригиналом вместо миниатюры уходит без валидаторов, чтобы
+    браузер не закрепил её ответом 304. Для асинхронных представлений
+    ``changed`` выполняется через ``core.executor``, а заголовки те же,
+    что ставит ``condition``.
+    """
+
+    def state(request: HttpRequest, *args, **kwargs) -> Tuple[Any, str]:
+        cached = getattr(request, "_page_state", None)
+        if cached is None:
+            modified, parts = changed(request, *args, **kwargs)
+            etag = md5(
+                repr(
+                    (
+                        request.user.pk,
+                        request.GET.urlencode(),
+                        modified,
+                        parts,
+                    ),
+                ).encode(),
+            ).hexdigest()
+            cached = request._page_state = (modified, etag)
+        return cached
+
+    def decorator(view: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(view):
+
+            @wraps(view)
+            async def async_wrapper(
+                request: HttpRequest,
+                *args,
+                **kwargs,
+            ) -> HttpResponse:
+                modified, etag = await executor.run(
+                    state,
+                    request,
+                    *args,
+                    **kwargs,
+                )
+                etag = quote_etag(etag)
+                last_modified = modified and timegm(modified.utctimetuple())
+                response = get_conditional_response(
+                    request,
+                    etag=etag,
+                    last_modified=last_modified,
+                )
+                if response is not None:
+                    return response
+                with thumbnails.track_fallbacks() as fallbacks:
+                    response = await view(request, *args, **kwargs)
+                if not fallbacks and request.method in ("GET", "HEAD"):
+                    if last_modified and not response.has_header(
+                        "Last-Modified",
+                    ):
+                        response["Last-Modified"] = http_date(last_modified)
+                    response.setdefault("ETag", etag)
+                return response
+
+            return async_wrapper
+
+        conditional = condition(
+            etag_func=lambda *args, **kwargs: state(*args, **kwargs)[1],
+            last_modified_func=lambda *args, **kwargs: state(
+                *args,
+                **kwargs,
+            )[0],
+        )(view)
+
+        @wraps(view)
+        def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            with thumbnails.track_fallbacks() as fallbacks:
+                response = conditional(request, *args, **kwargs)
+            if fallbacks:
+                for header in ("ETag", "Last-Modified"):
+                    if response.has_header(header):
+                        del response[header]
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.db import connections
+from django.db.backends.base.base import BaseDatabaseWrapper
+
+from core import metrics
+
+
+def configure_sqlite(
+    sender,
+    connection: BaseDatabaseWrapper,
+    **kwargs,
+) -> None:
+    """Применяет SQLITE_PRAGMAS к каждому новому соединению SQLite.
+
+    WAL позволяет читать, пока идёт запись, а synchronous=NORMAL в режиме
+    WAL не теряет целостность и заметно ускоряет коммиты. busy_timeout
+    заставляет писателя подождать блокировку вместо мгновенной ошибки
+    ``database is locked``.
+    """
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+
+
+def count_connection(
+    sender,
+    connection: BaseDatabaseWrapper,
+    **kwargs,
+) -> None:
+    metrics.DB_CONNECTIONS.inc(1, connection.alias, "new")
+
+
+def check_connections(sender, **kwargs) -> None:
+    """Проверяет постоянные соединения потока перед началом запроса.
+
+    Соединения живут CONN_MAX_AGE секунд и принадлежат потоку, поэтому
+    каждый поток воркера держит своё соединение на каждую базу. Просроченные
+    Django закрывает сам в ``close_old_connections``; здесь отбрасываются
+    соединения, которые сервер БД успел разорвать, чтобы запрос открыл
+    новое вместо ошибки на первом же обращении.
+    """
+    for connection in connections.all():
+        if connection.connection is None:
+            continue
+        if settings.DB_HEALTH_CHECKS and not connection.is_usable():
+            connection.close()
+            metrics.DB_CONNECTIONS.inc(1, connection.alias, "broken")
+        else:
+            metrics.DB_CONNECTIONS.inc(1, connection.alias, "reused")
@@ -0,0 +1,84 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from typing import Any, Callable, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+from core import metrics
+
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ASYNC_DB_WORKERS,
+                thread_name_prefix="yatube-db",
+            )
+    return _executor
+
+
+def _call(func: Callable, args: tuple, kwargs: dict) -> Any:
+    with ExitStack() as stack:
+        timings = metrics.current.get()
+        if timings is not None:
+            for connection in connections.all():
+                for wrapper in timings.wrappers:
+                    stack.enter_context(connection.execute_wrapper(wrapper))
+        return func(*args, **kwargs)
+
+
+def _pooled(func: Callable, args: tuple, kwargs: dict) -> Any:
+    try:
+        return _call(func, args, kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run(func: Callable, *args, **kwargs) -> Any:
+    """Выполняет синхронный код (ORM, кэш, шаблоны) из асинхронного.
+
+    Вызовы идут в общий пул из ASYNC_DB_WORKERS потоков, поэтому
+    независимые запросы к БД можно ждать вместе через ``asyncio.gather``,
+    а число одновременных соединений с базой ограничено размером пула.
+    У каждого потока пула своё постоянное соединение; после вызова оно
+    закрывается, только если устарело. При ASYNC_DB_WORKERS = 0 вызовы
+    выполняются по очереди в общем синхронном потоке, как у
+    ``sync_to_async`` по умолчанию.
+    """
+    if not settings.ASYNC_DB_WORKERS:
+        return await sync_to_async(_call)(func, args, kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(),
+        functools.partial(
+            contextvars.copy_context().run,
+            _pooled,
+            func,
+            args,
+            kwargs,
+        ),
+    )
+
+
+def submit(func: Callable, *args, **kwargs) -> None:
+    """Запускает синхронный код в пуле и не ждёт результата.
+
+    Для записей, которым не место в обработке запроса на чтение: поток
+    пула не наследует контекст запроса, так что запись не переключает
+    маршрутизатор запроса на основную базу. При ASYNC_DB_WORKERS = 0
+    вызов выполняется сразу, но тоже в чистом контексте.
+    """
+    if not settings.ASYNC_DB_WORKERS:
+        contextvars.Context().run(_call, func, args, kwargs)
+        return
+    get_executor().submit(_pooled, func, args, kwargs)
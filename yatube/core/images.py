@@ -0,0 +1,62 @@
+import hashlib
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile, UploadedFile
+from PIL import Image, ImageOps
+
+EXTENSIONS = {
+    "JPEG": ".jpg",
+    "PNG": ".png",
+    "WEBP": ".webp",
+}
+
+
+def _has_alpha(image: Image.Image) -> bool:
+    return image.mode in ("RGBA", "LA") or (
+        image.mode == "P" and "transparency" in image.info
+    )
+
+
+def normalize_image(upload: UploadedFile) -> UploadedFile:
+    """Уменьшает картинку, убирает метаданные и пережимает её.
+
+    JPEG декодируется в draft-режиме сразу в уменьшенном масштабе.
+    Картинки с прозрачностью сохраняются в PNG, если целевой формат
+    её не поддерживает; анимация остаётся нетронутой.
+    """
+    max_size = settings.POST_IMAGE_MAX_SIZE
+    upload.seek(0)
+    image = Image.open(upload)
+    if getattr(image, "is_animated", False):
+        upload.seek(0)
+        upload.image = image
+        return upload
+    image.draft("RGB", (max_size, max_size))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_size, max_size))
+    image_format = settings.POST_IMAGE_FORMAT
+    if _has_alpha(image):
+        if image_format == "JPEG":
+            image_format = "PNG"
+        image = image.convert("RGBA")
+    else:
+        image = image.convert("RGB")
+    image.info = {}
+    output = BytesIO()
+    image.save(
+        output,
+        image_format,
+        quality=settings.POST_IMAGE_QUALITY,
+        optimize=True,
+    )
+    normalized = SimpleUploadedFile(
+        name=os.path.splitext(os.path.basename(upload.name))[0]
+        + EXTENSIONS[image_format],
+        content=output.getvalue(),
+        content_type=Image.MIME[image_format],
+    )
+    normalized.image = image
+    normalized.content_hash = hashlib.sha256(output.getvalue()).hexdigest()
+    return normalized
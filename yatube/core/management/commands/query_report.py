@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import querylog
+
+ORDERINGS = ("total", "count", "max", "n_plus_one")
+
+
+class Command(BaseCommand):
+    help = "Сводка журнала запросов к БД по отпечаткам и местам вызова"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--file", default=settings.QUERY_LOG_FILE)
+        parser.add_argument("--limit", type=int, default=20)
+        parser.add_argument("--sort", choices=ORDERINGS, default="total")
+        parser.add_argument(
+            "--n-plus-one",
+            action="store_true",
+            help="Только запросы, повторявшиеся как N+1",
+        )
+
+    def handle(self, *args, **options) -> None:
+        if not options["file"]:
+            raise CommandError("Не задан QUERY_LOG_FILE")
+        try:
+            rows = querylog.aggregate(querylog.read(options["file"]))
+        except FileNotFoundError as error:
+            raise CommandError(f"Нет журнала {options['file']}") from error
+        if options["n_plus_one"]:
+            rows = [row for row in rows if row["n_plus_one"]]
+        rows.sort(key=lambda row: row[options["sort"]], reverse=True)
+        for row in rows[:options["limit"]]:
+            self.stdout.write(
+                "{total:9.1f} ms  {count:6} раз  макс {max:7.1f} ms  "
+                "{requests:5} запр.  {marker}".format(
+                    total=row["total"] * 1000,
+                    count=row["count"],
+                    max=row["max"] * 1000,
+                    requests=row["requests"],
+                    marker=(
+                        self.style.WARNING(f"N+1 ×{row['n_plus_one']}")
+                        if row["n_plus_one"]
+                        else ""
+                    ),
+                ),
+            )
+            self.stdout.write(
+                f"    {row['site']} ({', '.join(sorted(row['views']))})",
+            )
+            self.stdout.write(f"    {row['sql'][:300]}")
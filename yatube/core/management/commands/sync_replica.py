@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core import replication
+from core.routers import PRIMARY
+
+
+class Command(BaseCommand):
+    help = "Копирует основную базу SQLite в реплики онлайн-бэкапом"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "aliases",
+            nargs="*",
+            help="Реплики; по умолчанию все из DATABASES, кроме основной",
+        )
+
+    def handle(self, *args, **options) -> None:
+        aliases = options["aliases"] or [
+            alias for alias in settings.DATABASES if alias != PRIMARY
+        ]
+        if connections[PRIMARY].vendor != "sqlite":
+            raise CommandError("sync_replica работает только с SQLite")
+        for alias in aliases:
+            if alias not in settings.DATABASES:
+                raise CommandError(f"Нет базы {alias}")
+            connections[alias].close()
+            replication.sync(alias)
+            self.stdout.write(self.style.SUCCESS(f"{alias} обновлена"))
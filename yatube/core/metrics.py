@@ -0,0 +1,259 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+LAG_BUCKETS = (1, 2, 5, 10, 30, 60, 300, 3600)
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    return (
+        "{"
+        + ",".join(
+            '{}="{}"'.format(
+                name,
+                str(value).replace("\\", "\\\\").replace('"', '\\"'),
+            )
+            for name, value in zip(names, values)
+        )
+        + "}"
+    )
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Tuple[str, ...] = ("view",),
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount: float = 1, *labels: str) -> None:
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        with self.lock:
+            values = dict(self.values)
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{_labels(self.labels, labels)} {value}"
+
+
+class Histogram(Counter):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Tuple[str, ...] = ("view",),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = buckets
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self.lock:
+            state = self.values.get(labels)
+            if state is None:
+                state = self.values[labels] = [0] * len(self.buckets) + [0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+            state[-2] += 1
+            state[-1] += value
+
+    def samples(self) -> Iterator[str]:
+        with self.lock:
+            values = {
+                labels: list(state) for labels, state in self.values.items()
+            }
+        names = self.labels + ("le",)
+        for labels, state in sorted(values.items()):
+            for bound, count in zip(self.buckets, state):
+                yield "{}_bucket{} {}".format(
+                    self.name,
+                    _labels(names, labels + (bound,)),
+                    count,
+                )
+            yield "{}_bucket{} {}".format(
+                self.name,
+                _labels(names, labels + ("+Inf",)),
+                state[-2],
+            )
+            yield f"{self.name}_count{_labels(self.labels, labels)} {state[-2]}"
+            yield f"{self.name}_sum{_labels(self.labels, labels)} {state[-1]}"
+
+
+REGISTRY: List[Counter] = []
+
+REQUEST_DURATION = Histogram(
+    "yatube_request_duration_seconds",
+    "Время обработки запроса",
+)
+SAMPLED_REQUESTS = Counter(
+    "yatube_sampled_requests_total",
+    "Запросы с подробным замером",
+)
+DB_QUERIES = Histogram(
+    "yatube_db_queries",
+    "Число запросов к БД за запрос",
+    buckets=QUERY_BUCKETS,
+)
+DB_DURATION = Histogram(
+    "yatube_db_duration_seconds",
+    "Время запросов к БД за запрос",
+)
+TEMPLATE_DURATION = Histogram(
+    "yatube_template_duration_seconds",
+    "Время рендеринга шаблонов за запрос",
+)
+THUMBNAIL_DURATION = Histogram(
+    "yatube_thumbnail_duration_seconds",
+    "Время поиска миниатюр за запрос",
+)
+THUMBNAIL_GENERATION = Histogram(
+    "yatube_thumbnail_generation_seconds",
+    "Время построения миниатюры в фоне",
+    labels=(),
+)
+CACHE_REQUESTS = Counter(
+    "yatube_cache_requests_total",
+    "Обращения к кэшу страниц и карточек",
+    labels=("view", "result"),
+)
+REPLICA_LAG = Histogram(
+    "yatube_replica_lag_seconds",
+    "Отставание реплики при выборе базы для чтения",
+    labels=("alias",),
+    buckets=LAG_BUCKETS,
+)
+DB_CONNECTIONS = Counter(
+    "yatube_db_connections_total",
+    "Соединения с БД в начале запроса: новые, повторные и сброшенные",
+    labels=("alias", "result"),
+)
+
+
+class Timings:
+    """Замеры одного запроса, попавшего в выборку."""
+
+    def __init__(self) -> None:
+        self.db = 0.0
+        self.queries = 0
+        self.template = 0.0
+        self.thumbnail = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.active = set()
+        self.lock = threading.Lock()
+        self.wrappers: List[Callable] = [query_wrapper]
+
+
+current: ContextVar[Optional[Timings]] = ContextVar(
+    "request_timings",
+    default=None,
+)
+
+
+def add(field: str, value: float) -> None:
+    timings = current.get()
+    if timings is not None:
+        with timings.lock:
+            setattr(timings, field, getattr(timings, field) + value)
+
+
+def cache_access(hits: int, misses: int) -> None:
+    add("cache_hits", hits)
+    add("cache_misses", misses)
+
+
+@contextmanager
+def timer(field: str) -> Iterator[None]:
+    """Прибавляет к ``field`` время блока; вложенные блоки не считаются."""
+    timings = current.get()
+    if timings is None or field in timings.active:
+        yield
+        return
+    timings.active.add(field)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.active.discard(field)
+        add(field, time.perf_counter() - start)
+
+
+def query_wrapper(execute, sql, params, many, context):
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        add("db", time.perf_counter() - start)
+        add("queries", 1)
+
+
+def observe(view: str, duration: float, timings: Optional[Timings]) -> None:
+    REQUEST_DURATION.observe(duration, view)
+    if timings is None:
+        return
+    SAMPLED_REQUESTS.inc(1, view)
+    DB_QUERIES.observe(timings.queries, view)
+    DB_DURATION.observe(timings.db, view)
+    TEMPLATE_DURATION.observe(timings.template, view)
+    THUMBNAIL_DURATION.observe(timings.thumbnail, view)
+    if timings.cache_hits:
+        CACHE_REQUESTS.inc(timings.cache_hits, view, "hit")
+    if timings.cache_misses:
+        CACHE_REQUESTS.inc(timings.cache_misses, view, "miss")
+
+
+def server_timing(duration: float, timings: Timings) -> str:
+    return ", ".join(
+        (
+            f"total;dur={duration * 1000:.1f}",
+            f'db;dur={timings.db * 1000:.1f};desc="{timings.queries} queries"',
+            f"tpl;dur={timings.template * 1000:.1f}",
+            f"thumb;dur={timings.thumbnail * 1000:.1f}",
+            'cache;desc="{} hit, {} miss"'.format(
+                timings.cache_hits,
+                timings.cache_misses,
+            ),
+        ),
+    )
+
+
+def render() -> str:
+    """Все метрики процесса в текстовом формате Prometheus."""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
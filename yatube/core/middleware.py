@@ -0,0 +1,160 @@
+import asyncio
+import random
+import time
+from contextlib import ExitStack
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpRequest, HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+
+from core import metrics, querylog, replication, routers
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class MetricsMiddleware(MiddlewareMixin):
+    """Замеряет время ответа каждого запроса.
+
+    Для доли запросов METRICS_SAMPLE_RATE дополнительно считает запросы к
+    БД, время шаблонов и миниатюр, обращения к кэшу и отдаёт их в
+    заголовке Server-Timing. Метрики копятся в памяти процесса и
+    отдаются представлением ``core.views.metrics``. Если задан
+    QUERY_LOG_FILE, запросы к БД из выборки пишутся и в журнал запросов.
+
+    Под ASGI работает асинхронно; запросы к БД из пула потоков
+    ``core.executor`` считают обёртки из ``Timings.wrappers``.
+    """
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        timings, recorder = self.sample()
+        token = metrics.current.set(timings)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                if timings is not None:
+                    for connection in connections.all():
+                        for wrapper in timings.wrappers:
+                            stack.enter_context(
+                                connection.execute_wrapper(wrapper),
+                            )
+                response = self.get_response(request)
+        finally:
+            metrics.current.reset(token)
+        return self.finish(
+            request,
+            response,
+            time.perf_counter() - start,
+            timings,
+            recorder,
+        )
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        timings, recorder = self.sample()
+        token = metrics.current.set(timings)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.current.reset(token)
+        return self.finish(
+            request,
+            response,
+            time.perf_counter() - start,
+            timings,
+            recorder,
+        )
+
+    def sample(
+        self,
+    ) -> Tuple[Optional[metrics.Timings], Optional[querylog.Recorder]]:
+        if random.random() >= settings.METRICS_SAMPLE_RATE:
+            return None, None
+        timings = metrics.Timings()
+        recorder = None
+        if settings.QUERY_LOG_FILE:
+            recorder = querylog.Recorder()
+            timings.wrappers.append(recorder)
+        return timings, recorder
+
+    def finish(
+        self,
+        request: HttpRequest,
+        response: HttpResponse,
+        duration: float,
+        timings: Optional[metrics.Timings],
+        recorder: Optional[querylog.Recorder],
+    ) -> HttpResponse:
+        match = request.resolver_match
+        view = match.view_name if match else "unresolved"
+        metrics.observe(view, duration, timings)
+        if recorder is not None:
+            recorder.flush(view)
+        if timings is not None:
+            response["Server-Timing"] = metrics.server_timing(
+                duration,
+                timings,
+            )
+        return response
+
+
+class ReplicaMiddleware(MiddlewareMixin):
+    """Читает ленты с реплики, пока клиент недавно ничего не писал.
+
+    После запроса с записью клиент получает cookie на
+    REPLICA_STICKY_SECONDS, и всё это время его чтения идут на основную
+    базу: реплика может отставать, а автор должен видеть свой пост или
+    комментарий сразу. Реплика, отставшая больше
+    REPLICA_MAX_LAG_SECONDS, не используется; синхронизацию реплик
+    middleware запускает в фоне (``core.replication``).
+    """
+
+    def __init__(self, get_response) -> None:
+        super().__init__(get_response)
+        replication.start()
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        alias = routers.current.set(None)
+        wrote = routers.wrote.set(False)
+        try:
+            response = self.get_response(request)
+            pin = routers.wrote.get() or request.method not in SAFE_METHODS
+        finally:
+            routers.current.reset(alias)
+            routers.wrote.reset(wrote)
+        return self.pin(response) if pin else response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        alias = routers.current.set(None)
+        wrote = routers.wrote.set(False)
+        try:
+            response = await self.get_response(request)
+            pin = routers.wrote.get() or request.method not in SAFE_METHODS
+        finally:
+            routers.current.reset(alias)
+            routers.wrote.reset(wrote)
+        return self.pin(response) if pin else response
+
+    def pin(self, response: HttpResponse) -> HttpResponse:
+        response.set_cookie(
+            settings.REPLICA_PIN_COOKIE,
+            "1",
+            max_age=settings.REPLICA_STICKY_SECONDS,
+            httponly=True,
+            samesite="Lax",
+        )
+        return response
+
+    def process_view(self, request: HttpRequest, view, args, kwargs) -> None:
+        if (
+            settings.REPLICA_DATABASES
+            and request.method in SAFE_METHODS
+            and request.resolver_match.view_name in settings.REPLICA_VIEWS
+            and settings.REPLICA_PIN_COOKIE not in request.COOKIES
+        ):
+            routers.use_replica()
@@ -18,3 +18,46 @@ class BaseModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class VersionedModel(models.Model):
+    """Запись с версией, которая растёт при каждом её изменении.
+
+    Версию поднимает и ``save()``, и ``posts.counters`` при обновлении
+    счётчиков и зависимых данных, поэтому ключ ``cache_key`` меняется
+    вместе с содержимым и старые записи кэша просто перестают читаться.
+    Время изменения в ключе защищает от совпадений после пересоздания
+    базы, когда первичные ключи и версии начинаются заново.
+    """
+
+    version = models.PositiveIntegerField(
+        "версия",
+        default=1,
+        editable=False,
+    )
+    updated = models.DateTimeField("изменено", auto_now=True)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def cache_key(self) -> str:
+        return "{}:{}:v{}:{}".format(
+            self._meta.label_lower,
+            self.pk,
+            self.version,
+            self.updated.timestamp(),
+        )
+
+    def save(self, *args, **kwargs) -> None:
+        if not self._state.adding:
+            self.version = models.F("version") + 1
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {
+                    *kwargs["update_fields"],
+                    "version",
+                    "updated",
+                }
+        super().save(*args, **kwargs)
+        if not isinstance(self.version, int):
+            self.refresh_from_db(fields=("version",))
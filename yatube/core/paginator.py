@@ -0,0 +1,272 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections.abc import Sequence
+from functools import reduce
+from hashlib import md5
+from operator import or_
+from typing import Any, Callable, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+
+DEFAULT_KEYS = ("pub_date", "pk")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class CursorPaginator(Paginator):
+    """Постраничный вывод по ключу (keyset) вместо OFFSET.
+
+    Страница выбирается условием ``(pub_date, id) < курсор`` и читается
+    по индексу за постоянное время, сколько бы страниц ни было до неё.
+    Общее число объектов и переход по номеру страницы включаются только
+    заданным ``count_timeout``; число берётся из кэша.
+
+    ``extra`` — строки того же вида, что и в ``object_list``, которых ещё
+    нет в базе; они вливаются в страницы по тем же ключам. Число объектов
+    и страницы дальше первой при листании по номеру их не учитывают.
+    """
+
+    def __init__(
+        self,
+        object_list: QuerySet,
+        per_page: int,
+        keys: Tuple[str, ...] = DEFAULT_KEYS,
+        count_timeout: Optional[int] = None,
+        transform: Optional[Callable[[Any], Any]] = None,
+        extra: Sequence = (),
+    ) -> None:
+        super().__init__(object_list, per_page)
+        self.keys = keys
+        self.count_timeout = count_timeout
+        self.transform = transform
+        self.extra = extra
+
+    @cached_property
+    def count(self) -> Optional[int]:
+        if self.count_timeout is None:
+            return None
+        return cache.get_or_set(
+            "paginator-count:"
+            + md5(str(self.object_list.query).encode()).hexdigest(),
+            self.object_list.count,
+            self.count_timeout,
+        )
+
+    @cached_property
+    def num_pages(self) -> Optional[int]:
+        if self.count is None:
+            return None
+        return super().num_pages
+
+    def key_values(self, obj: Any) -> Tuple[Any, ...]:
+        return tuple(
+            obj[key] if isinstance(obj, dict) else getattr(obj, key)
+            for key in self.keys
+        )
+
+    def encode_cursor(self, number: int, obj: Any) -> str:
+        values = [number]
+        for value in self.key_values(obj):
+            values.append(
+                value.isoformat() if hasattr(value, "isoformat") else value,
+            )
+        return (
+            urlsafe_b64encode(json.dumps(values).encode())
+            .decode()
+            .rstrip("=")
+        )
+
+    def decode_cursor(self, cursor: str) -> Tuple[int, List[Any]]:
+        try:
+            number, *values = json.loads(
+                urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)),
+            )
+            if len(values) != len(self.keys):
+                raise InvalidCursor(cursor)
+            meta = self.object_list.model._meta
+            return max(int(number), 1), [
+                (meta.pk if key == "pk" else meta.get_field(key)).to_python(
+                    value,
+                )
+                for key, value in zip(self.keys, values)
+            ]
+        except (TypeError, ValueError, ValidationError) as error:
+            raise InvalidCursor(cursor) from error
+
+    def _ordered(self, descending: bool = True) -> QuerySet:
+        return self.object_list.order_by(
+            *(f"-{key}" if descending else key for key in self.keys),
+        )
+
+    def _seek(self, values: List[Any], lookup: str) -> Q:
+        return reduce(
+            or_,
+            (
+                Q(
+                    **dict(zip(self.keys[:index], values[:index])),
+                    **{f"{self.keys[index]}__{lookup}": values[index]},
+                )
+                for index in range(len(self.keys))
+            ),
+        )
+
+    def _merge(
+        self,
+        objects: List[Any],
+        descending: bool = True,
+        keep: Callable[[Tuple[Any, ...]], bool] = lambda values: True,
+    ) -> List[Any]:
+        """Вливает подходящие строки ``extra`` в выборку страницы."""
+        extra = [obj for obj in self.extra if keep(self.key_values(obj))]
+        if not extra:
+            return objects
+        return sorted(
+            objects + extra,
+            key=self.key_values,
+            reverse=descending,
+        )[:self.per_page + 1]
+
+    def first_page(self) -> "CursorPage":
+        return self.number_page(1)
+
+    def number_page(self, number: int) -> "CursorPage":
+        offset = (number - 1) * self.per_page
+        objects = list(
+            self._ordered()[offset:offset + self.per_page + 1],
+        )
+        if not offset:
+            objects = self._merge(objects)
+        return CursorPage(
+            objects[:self.per_page],
+            number,
+            self,
+            has_previous=number > 1,
+            has_next=len(objects) > self.per_page,
+        )
+
+    def older_page(self, cursor: str) -> "CursorPage":
+        number, values = self.decode_cursor(cursor)
+        objects = self._merge(
+            list(
+                self._ordered()
+                .filter(self._seek(values, "lt"))[:self.per_page + 1],
+            ),
+            keep=lambda key: key < tuple(values),
+        )
+        return CursorPage(
+            objects[:self.per_page],
+            number + 1,
+            self,
+            has_previous=True,
+            has_next=len(objects) > self.per_page,
+        )
+
+    def newer_page(self, cursor: str) -> "CursorPage":
+        number, values = self.decode_cursor(cursor)
+        objects = self._merge(
+            list(
+                self._ordered(descending=False)
+                .filter(self._seek(values, "gt"))[:self.per_page + 1],
+            ),
+            descending=False,
+            keep=lambda key: key > tuple(values),
+        )
+        if len(objects) <= self.per_page:
+            return self.first_page()
+        return CursorPage(
+            objects[:self.per_page][::-1],
+            max(number - 1, 2),
+            self,
+            has_previous=True,
+            has_next=True,
+        )
+
+    def get_cursor_page(
+        self,
+        after: Optional[str] = None,
+        before: Optional[str] = None,
+        number: Optional[str] = None,
+    ) -> "CursorPage":
+        try:
+            if after:
+                return self.older_page(after)
+            if before:
+                return self.newer_page(before)
+            if self.count_timeout is None:
+                return self.first_page()
+            return self.number_page(max(int(number or 1), 1))
+        except (InvalidCursor, ValueError):
+            return self.first_page()
+
+
+class CursorPage(Sequence):
+    def __init__(
+        self,
+        rows: List[Any],
+        number: int,
+        paginator: CursorPaginator,
+        has_previous: bool,
+        has_next: bool,
+    ) -> None:
+        self.rows = rows
+        self.object_list = (
+            [paginator.transform(row) for row in rows]
+            if paginator.transform
+            else rows
+        )
+        self.number = number
+        self.paginator = paginator
+        self._has_previous = has_previous
+        self._has_next = has_next
+
+    def __repr__(self) -> str:
+        return f"<CursorPage {self.number}>"
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+    def __getitem__(self, index: Any) -> Any:
+        return self.object_list[index]
+
+    def has_next(self) -> bool:
+        return self._has_next
+
+    def has_previous(self) -> bool:
+        return self._has_previous
+
+    def has_other_pages(self) -> bool:
+        return self._has_previous or self._has_next
+
+    def next_page_number(self) -> int:
+        return self.number + 1
+
+    def previous_page_number(self) -> int:
+        return self.number - 1
+
+    @cached_property
+    def next_cursor(self) -> Optional[str]:
+        if not self._has_next or not self.rows:
+            return None
+        return self.paginator.encode_cursor(self.number, self.rows[-1])
+
+    @cached_property
+    def previous_cursor(self) -> Optional[str]:
+        if not self._has_previous or not self.rows:
+            return None
+        return self.paginator.encode_cursor(self.number, self.rows[0])
+
+    @cached_property
+    def elided_page_range(self) -> List[Any]:
+        if self.paginator.num_pages is None:
+            return []
+        return list(
+            self.paginator.get_elided_page_range(
+                min(self.number, self.paginator.num_pages or 1),
+            ),
+        )
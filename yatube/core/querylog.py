@@ -0,0 +1,132 @@
+import json
+import re
+import sys
+import threading
+import time
+from hashlib import md5
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+STRING = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+PLACEHOLDERS = re.compile(r"\(\s*(?:(?:%s|\?)\s*,\s*)+(?:%s|\?)\s*\)")
+SPACES = re.compile(r"\s+")
+SKIPPED = (
+    "core/querylog.py",
+    "core/metrics.py",
+    "core/middleware.py",
+)
+
+_lock = threading.Lock()
+
+
+def normalize(sql: str) -> str:
+    """Приводит запрос к виду без литералов и длинных списков IN."""
+    sql = STRING.sub("?", sql)
+    sql = NUMBER.sub("?", sql)
+    sql = sql.replace("%s", "?")
+    sql = PLACEHOLDERS.sub("(...)", sql)
+    return SPACES.sub(" ", sql).strip()
+
+
+def fingerprint(sql: str) -> str:
+    return md5(normalize(sql).encode()).hexdigest()[:12]
+
+
+def call_site() -> str:
+    """Ближайший к запросу кадр из кода проекта."""
+    base = str(settings.BASE_DIR) + "/"
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(base) and not filename.endswith(SKIPPED):
+            return "{}:{} in {}".format(
+                filename[len(base):],
+                frame.f_lineno,
+                frame.f_code.co_name,
+            )
+        frame = frame.f_back
+    return "unknown"
+
+
+class Recorder:
+    """Собирает запросы одного HTTP-запроса по отпечаткам и местам вызова."""
+
+    def __init__(self) -> None:
+        self.queries: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            key = (fingerprint(sql), call_site())
+            entry = self.queries.setdefault(
+                key,
+                {"sql": normalize(sql), "count": 0, "total": 0.0, "max": 0.0},
+            )
+            entry["count"] += 1
+            entry["total"] += duration
+            entry["max"] = max(entry["max"], duration)
+
+    def entries(self, view: str) -> Iterator[Dict[str, Any]]:
+        for (key, site), entry in self.queries.items():
+            yield {
+                "fingerprint": key,
+                "view": view,
+                "site": site,
+                "n_plus_one": entry["count"]
+                >= settings.QUERY_LOG_REPEAT_THRESHOLD,
+                "slow": entry["max"] * 1000 >= settings.QUERY_LOG_SLOW_MS,
+                **entry,
+            }
+
+    def flush(self, view: str) -> None:
+        if self.queries:
+            write(self.entries(view))
+
+
+def write(entries: Iterable[Dict[str, Any]]) -> None:
+    path = Path(settings.QUERY_LOG_FILE)
+    lines = "".join(
+        json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries
+    )
+    with _lock, path.open("a", encoding="utf-8") as log:
+        log.write(lines)
+
+
+def read(path: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    with open(path or settings.QUERY_LOG_FILE, encoding="utf-8") as log:
+        for line in log:
+            if line.strip():
+                yield json.loads(line)
+
+
+def aggregate(entries: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Сводит записи журнала по паре (отпечаток, место вызова)."""
+    report: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for entry in entries:
+        row = report.setdefault(
+            (entry["fingerprint"], entry["site"]),
+            {
+                "fingerprint": entry["fingerprint"],
+                "site": entry["site"],
+                "sql": entry["sql"],
+                "views": set(),
+                "requests": 0,
+                "count": 0,
+                "total": 0.0,
+                "max": 0.0,
+                "n_plus_one": 0,
+            },
+        )
+        row["views"].add(entry["view"])
+        row["requests"] += 1
+        row["count"] += entry["count"]
+        row["total"] += entry["total"]
+        row["max"] = max(row["max"], entry["max"])
+        row["n_plus_one"] += entry["n_plus_one"]
+    return list(report.values())
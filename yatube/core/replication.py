@@ -0,0 +1,128 @@
+"""Синхронизация реплик SQLite с основной базой.
+
+Реплика — копия основной базы, снятая онлайн-бэкапом. После копии
+обновляется mtime файла-отметки (``routers.synced_marker``), и любой
+процесс по нему знает, насколько реплика может отставать, не обращаясь
+к БД. ``start`` запускает в процессе фоновую синхронизацию раз в
+REPLICA_SYNC_SECONDS; при нескольких процессах копирует тот, кто взял
+блокировку файла, остальные видят свежую отметку и пропускают ход.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from django.conf import settings
+from django.db import connections
+
+from core import routers
+
+logger = logging.getLogger(__name__)
+
+_locks: Dict[str, threading.Lock] = {}
+_lock = threading.Lock()
+_thread: Optional[threading.Thread] = None
+
+
+def _name(alias: str) -> str:
+    return connections[alias].settings_dict["NAME"]
+
+
+@contextmanager
+def _exclusive(alias: str, blocking: bool) -> Iterator[bool]:
+    """Блокировка синхронизации реплики между потоками и процессами."""
+    with _lock:
+        lock = _locks.setdefault(alias, threading.Lock())
+    if not lock.acquire(blocking):
+        yield False
+        return
+    try:
+        if fcntl is None:
+            yield True
+            return
+        with open(_name(alias) + ".lock", "a") as file:
+            flags = fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB)
+            try:
+                fcntl.flock(file, flags)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+    finally:
+        lock.release()
+
+
+def sync(alias: str, blocking: bool = True) -> bool:
+    """Копирует основную базу в реплику и отмечает время копии.
+
+    Возвращает False, если без ожидания (``blocking=False``) реплику уже
+    копирует другой поток или процесс.
+    """
+    with _exclusive(alias, blocking) as acquired:
+        if not acquired:
+            return False
+        started = time.time()
+        source = sqlite3.connect(_name(routers.PRIMARY), uri=True)
+        try:
+            target = sqlite3.connect(_name(alias), uri=True)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+        finally:
+            source.close()
+        marker = routers.synced_marker(alias)
+        open(marker, "a").close()
+        os.utime(marker, (started, started))
+        return True
+
+
+def stale() -> Iterator[str]:
+    """Реплики, которые пора синхронизировать."""
+    for alias in settings.REPLICA_DATABASES:
+        if routers.lag(alias) >= settings.REPLICA_SYNC_SECONDS:
+            yield alias
+
+
+def _run() -> None:
+    while True:
+        time.sleep(settings.REPLICA_SYNC_SECONDS)
+        for alias in stale():
+            try:
+                sync(alias, blocking=False)
+            except sqlite3.Error:
+                logger.exception("Не удалось синхронизировать %s", alias)
+
+
+def start() -> None:
+    """Запускает фоновую синхронизацию реплик, если она нужна.
+
+    Реплики-зеркала из тестов никогда не отстают, и для них поток не
+    запускается; при REPLICA_SYNC_SECONDS = 0 реплики обновляются только
+    командой ``sync_replica``.
+    """
+    global _thread
+    if not settings.REPLICA_SYNC_SECONDS or not any(
+        not routers.same_database(alias, routers.PRIMARY)
+        for alias in settings.REPLICA_DATABASES
+    ):
+        return
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(
+                target=_run,
+                name="yatube-replica-sync",
+                daemon=True,
+            )
+            _thread.start()
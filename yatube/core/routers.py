@@ -0,0 +1,97 @@
+import math
+import os
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from django.conf import settings
+from django.db import connections
+
+from core import metrics
+
+PRIMARY = "default"
+
+current: ContextVar[Optional[str]] = ContextVar("read_alias", default=None)
+wrote: ContextVar[bool] = ContextVar("wrote", default=False)
+
+
+def same_database(alias: str, other: str) -> bool:
+    """Реплика-зеркало в тестах указывает на ту же базу, что и основная."""
+    return (
+        connections[alias].settings_dict["NAME"]
+        == connections[other].settings_dict["NAME"]
+    )
+
+
+def synced_marker(alias: str) -> str:
+    """Файл, mtime которого — начало последней синхронизации реплики."""
+    return connections[alias].settings_dict["NAME"] + ".synced"
+
+
+def lag(alias: str) -> float:
+    """Сколько секунд реплика может отставать от основной базы."""
+    if same_database(alias, PRIMARY):
+        return 0.0
+    try:
+        return time.time() - os.path.getmtime(synced_marker(alias))
+    except OSError:
+        return math.inf
+
+
+def use_replica() -> None:
+    """Включает чтение с реплики, отстающей не больше допустимого.
+
+    Если все реплики отстали больше REPLICA_MAX_LAG_SECONDS или ещё ни
+    разу не синхронизированы, чтение остаётся на основной базе.
+    """
+    fresh = []
+    for alias in settings.REPLICA_DATABASES:
+        seconds = lag(alias)
+        if math.isinf(seconds):
+            continue
+        metrics.REPLICA_LAG.observe(seconds, alias)
+        if seconds <= settings.REPLICA_MAX_LAG_SECONDS:
+            fresh.append(alias)
+    if fresh:
+        current.set(random.choice(fresh))
+
+
+@contextmanager
+def primary() -> Iterator[None]:
+    """Читает с основной базы: для данных, которые попадут в общий кэш."""
+    token = current.set(None)
+    written = wrote.set(False)
+    try:
+        yield
+    finally:
+        if not wrote.get():
+            wrote.reset(written)
+            current.reset(token)
+
+
+class ReplicaRouter:
+    """Отправляет чтение на реплику, если запрос разрешил это явно.
+
+    Реплику включает ``ReplicaMiddleware`` для представлений лент. Первая
+    же запись в запросе возвращает чтение на основную базу, чтобы запрос
+    видел собственные изменения.
+    """
+
+    def db_for_read(self, model, **hints) -> Optional[str]:
+        alias = current.get()
+        if alias is None or same_database(alias, PRIMARY):
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints) -> str:
+        current.set(None)
+        wrote.set(True)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        return True
+
+    def allow_migrate(self, db: str, app_label: str, **hints) -> bool:
+        return db not in settings.REPLICA_DATABASES
@@ -0,0 +1,113 @@
+import hashlib
+import os
+import posixpath
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from sorl.thumbnail import delete as delete_thumbnails
+from sorl.thumbnail.images import ImageFile
+
+CONTENT_NAME = re.compile(r"(^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.\w+$")
+
+_lock = threading.Lock()
+
+
+def content_hash(content: File) -> str:
+    digest = getattr(content, "content_hash", None)
+    if digest:
+        return digest
+    sha256 = hashlib.sha256()
+    for chunk in content.chunks():
+        sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит файлы под именем, вычисленным из SHA-256 содержимого.
+
+    Одинаковые загрузки получают одно имя и один файл на диске, а значит и
+    один набор миниатюр sorl. Файл удаляется, когда на него не ссылается
+    ни один пост (см. ``posts.signals``).
+
+    Повторная загрузка уже лежащего файла обновляет его mtime, и
+    ``release`` не трогает файл, пока не истёк MEDIA_RELEASE_GRACE_SECONDS:
+    пост с такой загрузкой ещё может быть не зафиксирован в базе.
+    Проверка и удаление идут под общей с ``save`` блокировкой.
+    """
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        """Блокировка между потоками, а при наличии fcntl и процессами."""
+        with _lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(self.location, exist_ok=True)
+            with open(os.path.join(self.location, ".lock"), "a") as file:
+                fcntl.flock(file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(file, fcntl.LOCK_UN)
+
+    def leased(self, name: str) -> bool:
+        """Файл загружен или переиспользован недавно."""
+        try:
+            modified = os.path.getmtime(self.path(name))
+        except OSError:
+            return False
+        return time.time() - modified < settings.MEDIA_RELEASE_GRACE_SECONDS
+
+    def content_name(self, name: str, content: File) -> str:
+        digest = content_hash(content)
+        return posixpath.join(
+            posixpath.dirname(name),
+            digest[:2],
+            digest[2:4],
+            digest + os.path.splitext(name)[1].lower(),
+        )
+
+    def save(
+        self,
+        name: Optional[str],
+        content: File,
+        max_length: Optional[int] = None,
+    ) -> str:
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = self.content_name(name, content)
+        with self.lock():
+            if self.exists(name):
+                os.utime(self.path(name))
+                return name
+            return super().save(name, content, max_length)
+
+    @staticmethod
+    def is_content_name(name: str) -> bool:
+        return bool(CONTENT_NAME.search(name))
+
+
+def release(model: type, field_name: str, name: Optional[str]) -> None:
+    """Удаляет файл и его миниатюры, если на него больше нет ссылок."""
+    if not name:
+        return
+    storage = model._meta.get_field(field_name).storage
+    with storage.lock():
+        if (
+            storage.is_content_name(name) and storage.leased(name)
+        ) or model._default_manager.filter(**{field_name: name}).exists():
+            return
+        delete_thumbnails(ImageFile(name, storage))
@@ -0,0 +1,27 @@
+from typing import Any
+
+from django.template.backends.django import DjangoTemplates as Base
+
+from core import metrics
+
+
+class Template:
+    def __init__(self, template: Any) -> None:
+        self.template = template
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None) -> str:
+        with metrics.timer("template"):
+            return self.template.render(context, request)
+
+
+class DjangoTemplates(Base):
+    """Шаблонизатор Django, замеряющий время рендеринга для метрик."""
+
+    def from_string(self, template_code: str) -> Template:
+        return Template(super().from_string(template_code))
+
+    def get_template(self, template_name: str) -> Template:
+        return Template(super().get_template(template_name))
@@ -0,0 +1,150 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from django.conf import settings
+from django.db import connections, transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from core import metrics
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_pending = set()
+_lock = threading.Lock()
+_fallbacks: ContextVar[Optional[List[str]]] = ContextVar(
+    "thumbnail_fallbacks",
+    default=None,
+)
+
+
+@contextmanager
+def track_fallbacks() -> Iterator[List[str]]:
+    """Собирает картинки, отданные оригиналом вместо миниатюры.
+
+    HTML с такими картинками нельзя класть в кэш надолго: миниатюра
+    появится через секунды, а ключ кэша от этого не изменится.
+    Вложенный замер передаёт найденное внешнему.
+    """
+    names: List[str] = []
+    token = _fallbacks.set(names)
+    try:
+        yield names
+    finally:
+        _fallbacks.reset(token)
+        parent = _fallbacks.get()
+        if parent is not None:
+            parent.extend(names)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix="thumbnails",
+            )
+        return _executor
+
+
+class BackgroundThumbnailBackend(ThumbnailBackend):
+    """Не режет картинки в запросе.
+
+    Готовая миниатюра берётся из KV-хранилища sorl, а при промахе шаблон
+    получает оригинал, пока миниатюра строится в фоновом потоке.
+    """
+
+    def _options(self, source: ImageFile, options: Dict[str, Any]) -> Dict:
+        options = dict(options)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault("format", self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        return options
+
+    def get_thumbnail(self, file_: Any, geometry_string: str, **options):
+        with metrics.timer("thumbnail"):
+            return self.lookup(file_, geometry_string, **options)
+
+    def lookup(self, file_: Any, geometry_string: str, **options):
+        if not settings.THUMBNAIL_WORKERS:
+            return super().get_thumbnail(file_, geometry_string, **options)
+        source = ImageFile(file_)
+        cached = default.kvstore.get(
+            ImageFile(
+                self._get_thumbnail_filename(
+                    source,
+                    geometry_string,
+                    self._options(source, options),
+                ),
+                default.storage,
+            ),
+        )
+        if cached:
+            return cached
+        enqueue(source, geometry_string, **options)
+        fallbacks = _fallbacks.get()
+        if fallbacks is not None:
+            fallbacks.append(source.name)
+        return source
+
+    def generate(self, source: ImageFile, geometry_string: str, **options):
+        return super().get_thumbnail(source, geometry_string, **options)
+
+
+def _generate(key: tuple, source: ImageFile, geometry: str, options) -> None:
+    start = time.perf_counter()
+    try:
+        default.backend.generate(source, geometry, **options)
+        metrics.THUMBNAIL_GENERATION.observe(time.perf_counter() - start)
+    except Exception:
+        logger.exception("Не удалось построить миниатюру %s", source.name)
+    finally:
+        with _lock:
+            _pending.discard(key)
+
+
+def _work(key: tuple, source: ImageFile, geometry: str, options) -> None:
+    try:
+        _generate(key, source, geometry, options)
+    finally:
+        connections.close_all()
+
+
+def enqueue(source: Any, geometry: str, **options) -> None:
+    """Ставит миниатюру в очередь после фиксации транзакции."""
+    source = ImageFile(source)
+    key = (source.name, geometry, tuple(sorted(options.items())))
+
+    def submit() -> None:
+        with _lock:
+            if key in _pending:
+                return
+            _pending.add(key)
+        if settings.THUMBNAIL_WORKERS:
+            _get_executor().submit(_work, key, source, geometry, options)
+        else:
+            _generate(key, source, geometry, options)
+
+    transaction.on_commit(submit)
+
+
+def pregenerate(image: Any) -> None:
+    if not image:
+        return
+    for geometry, options in settings.THUMBNAIL_GEOMETRIES:
+        enqueue(image, geometry, **options)
@@ -0,0 +1,124 @@
+import hashlib
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import (
+    MemoryFileUploadHandler,
+    SkipFile,
+    TemporaryFileUploadHandler,
+)
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+
+SIGNATURES = (
+    (b"\xff\xd8\xff",),
+    (b"\x89PNG\r\n\x1a\n",),
+    (b"GIF87a",),
+    (b"GIF89a",),
+    (b"RIFF", b"WEBP"),
+)
+
+
+def _is_image(head: bytes) -> bool:
+    for signature in SIGNATURES:
+        if head.startswith(signature[0]) and (
+            len(signature) == 1 or head[8:12] == signature[1]
+        ):
+            return True
+    return False
+
+
+class ImageUploadMixin:
+    """Проверяет и хэширует загружаемую картинку на лету.
+
+    Тип, размер и сигнатура файла проверяются по мере чтения потока,
+    поэтому неподходящий файл отбрасывается, не попав ни в память, ни во
+    временный файл. Причина отказа сохраняется в ``request.upload_errors``.
+    Слишком большой запрос не читается вовсе: форма получает пустые
+    данные и ошибку вместо полей.
+    """
+
+    def handle_raw_input(
+        self,
+        input_data,
+        META,
+        content_length,
+        boundary,
+        encoding=None,
+    ) -> Optional[Tuple[QueryDict, MultiValueDict]]:
+        if content_length > settings.UPLOAD_REQUEST_MAX_SIZE:
+            self.record(None, "Слишком большой запрос.")
+            return QueryDict(encoding=encoding), MultiValueDict()
+        return super().handle_raw_input(
+            input_data,
+            META,
+            content_length,
+            boundary,
+            encoding,
+        )
+
+    def new_file(
+        self,
+        field_name,
+        file_name,
+        content_type,
+        content_length,
+        charset=None,
+        content_type_extra=None,
+    ) -> None:
+        self.received = 0
+        self.sha256 = hashlib.sha256()
+        self.upload_field = field_name
+        if content_type not in settings.UPLOAD_IMAGE_CONTENT_TYPES:
+            self.reject(field_name, "Загрузите картинку JPEG, PNG, GIF, WebP.")
+        if (content_length or 0) > settings.UPLOAD_IMAGE_MAX_SIZE:
+            self.reject(field_name, "Картинка слишком большая.")
+        super().new_file(
+            field_name,
+            file_name,
+            content_type,
+            content_length,
+            charset,
+            content_type_extra,
+        )
+
+    def receive_data_chunk(
+        self,
+        raw_data: bytes,
+        start: int,
+    ) -> Optional[bytes]:
+        if getattr(self, "activated", True):
+            if not start and not _is_image(raw_data[:12]):
+                self.reject(self.upload_field, "Файл не является картинкой.")
+            self.received += len(raw_data)
+            if self.received > settings.UPLOAD_IMAGE_MAX_SIZE:
+                self.reject(self.upload_field, "Картинка слишком большая.")
+            self.sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size: int) -> Optional[UploadedFile]:
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.content_hash = self.sha256.hexdigest()
+        return file
+
+    def record(self, field_name: Optional[str], message: str) -> None:
+        if not hasattr(self.request, "upload_errors"):
+            self.request.upload_errors = {}
+        self.request.upload_errors[field_name] = message
+
+    def reject(self, field_name: Optional[str], message: str) -> None:
+        self.record(field_name, message)
+        raise SkipFile(message)
+
+
+class MemoryImageUploadHandler(ImageUploadMixin, MemoryFileUploadHandler):
+    pass
+
+
+class TemporaryImageUploadHandler(
+    ImageUploadMixin,
+    TemporaryFileUploadHandler,
+):
+    pass
@@ -1,17 +1,39 @@
-from typing import List
+from typing import Any, Callable, Optional, Sequence, Tuple
 
 from django.conf import settings
-from django.core.paginator import Page, Paginator
+from django.db.models import QuerySet
 from django.http import HttpRequest
 
+from core.paginator import DEFAULT_KEYS, CursorPage, CursorPaginator
+
 
 def paginate(
     request: HttpRequest,
-    post_list: List,
+    post_list: QuerySet,
     objects_per_page: int = settings.OBJECTS_PER_PAGE,
-) -> Page:
-    return Paginator(post_list, objects_per_page).get_page(
-        request.GET.get("page"),
+    keys: Tuple[str, ...] = DEFAULT_KEYS,
+    transform: Optional[Callable[[Any], Any]] = None,
+    count: bool = False,
+    extra: Sequence = (),
+) -> CursorPage:
+    """Страница по курсору из запроса.
+
+    ``count`` включает номера страниц: общее число объектов из кэша и
+    переход на ``?page=N`` через OFFSET. Без него страницы листаются
+    только курсорами, а ``?page`` открывает первую. ``extra`` — строки,
+    которых ещё нет в базе и которые вливаются в страницы по ключам.
+    """
+    return CursorPaginator(
+        post_list,
+        objects_per_page,
+        keys=keys,
+        count_timeout=settings.PAGINATOR_COUNT_TIMEOUT if count else None,
+        transform=transform,
+        extra=extra,
+    ).get_cursor_page(
+        after=request.GET.get("after"),
+        before=request.GET.get("before"),
+        number=request.GET.get("page"),
     )
 
 
@@ -1,9 +1,12 @@
 from http import HTTPStatus
-from typing import Any
+from typing import Optional
 
-from django.http import HttpRequest, HttpResponse
+from django.conf import settings
+from django.http import Http404, HttpRequest, HttpResponse
 from django.shortcuts import render
 
+from core import metrics as registry
+
 
 def page_not_found(request: HttpRequest, exception) -> HttpResponse:
     del exception
@@ -17,7 +20,12 @@ def page_not_found(request: HttpRequest, exception) -> HttpResponse:
     )
 
 
-def csrf_failure(request: HttpRequest, *args: Any) -> HttpResponse:
+def csrf_failure(
+    request: HttpRequest,
+    exception: Optional[Exception] = None,
+    reason: str = "",
+) -> HttpResponse:
+    del exception, reason
     return render(
         request,
         "core/403csrf.html",
@@ -31,3 +39,12 @@ def server_failure(request: HttpRequest) -> HttpResponse:
         "core/500.html",
         status=HTTPStatus.INTERNAL_SERVER_ERROR,
     )
+
+
+def metrics(request: HttpRequest) -> HttpResponse:
+    if request.META.get("REMOTE_ADDR") not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    return HttpResponse(
+        registry.render(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -0,0 +1,293 @@
+"""JSON API лент только для чтения.
+
+Строки берутся плоскими запросами ``.values()`` без создания моделей.
+ETag считается до сборки ответа по дешёвым отметкам ``posts.freshness``
+и параметрам страницы; клиент с совпавшим If-None-Match получает 304,
+и строки ленты не запрашиваются вовсе.
+"""
+import json
+from hashlib import md5
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Max
+from django.http import (
+    Http404,
+    HttpRequest,
+    HttpResponse,
+    HttpResponseNotModified,
+    JsonResponse,
+)
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_safe
+
+from core.cache import PageState, get_generation
+from core.paginator import CursorPage
+from core.utils import paginate
+from posts import follow_graph, freshness, timeline
+from posts.models import Comment, Group, Post, TimelineEntry, User
+
+POST_FIELDS = (
+    'pk',
+    'text',
+    'pub_date',
+    'image',
+    'comments_count',
+    'version',
+    'author__username',
+    'group__slug',
+)
+COMMENT_FIELDS = ('pk', 'text', 'created', 'author__username')
+GROUP_FIELDS = ('slug', 'title', 'description')
+PROFILE_FIELDS = (
+    'username',
+    'first_name',
+    'last_name',
+    'profile__posts_count',
+    'profile__followers_count',
+    'profile__following_count',
+)
+IMAGES = Post._meta.get_field('image').storage
+
+
+def post_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'id': row['pk'],
+        'text': row['text'],
+        'pub_date': row['pub_date'],
+        'author': row['author__username'],
+        'group': row['group__slug'],
+        'image': IMAGES.url(row['image']) if row['image'] else None,
+        'comments': row['comments_count'],
+        'version': row['version'],
+    }
+
+
+def timeline_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    return post_row(
+        {
+            'pk': row['post_id'],
+            **{
+                key[len('post__'):]: value
+                for key, value in row.items()
+                if key.startswith('post__')
+            },
+        },
+    )
+
+
+def comment_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'id': row['pk'],
+        'text': row['text'],
+        'created': row['created'],
+        'author': row['author__username'],
+    }
+
+
+def profile_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'username': row['username'],
+        'first_name': row['first_name'],
+        'last_name': row['last_name'],
+        'posts_count': row['profile__posts_count'],
+        'followers_count': row['profile__followers_count'],
+        'following_count': row['profile__following_count'],
+    }
+
+
+def page_payload(page: CursorPage) -> Dict[str, Any]:
+    return {
+        'results': list(page),
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    }
+
+
+def encode(payload: Any) -> bytes:
+    return json.dumps(
+        payload,
+        cls=DjangoJSONEncoder,
+        ensure_ascii=False,
+        separators=(',', ':'),
+    ).encode()
+
+
+def validator(request: HttpRequest, state: Any) -> str:
+    """ETag от состояния ресурса и параметров запроса (курсора)."""
+    key = repr((state, sorted(request.GET.lists())))
+    return '"{}"'.format(md5(key.encode()).hexdigest())
+
+
+def respond(
+    request: HttpRequest,
+    state: Optional[Any],
+    build: Callable[[], Any],
+) -> HttpResponse:
+    """Отвечает 304 по ``state``, не вызывая ``build``.
+
+    ``state`` должен меняться вместе с телом ответа; ``None`` значит,
+    что ресурса нет, и ``build`` сам ответит 404.
+    """
+    if state is None:
+        return HttpResponse(encode(build()), content_type='application/json')
+    etag = validator(request, state)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(
+            encode(build()),
+            content_type='application/json',
+        )
+    elif not isinstance(response, HttpResponseNotModified):
+        return response
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def found(*states: PageState) -> Optional[tuple]:
+    """Склеивает отметки ``posts.freshness``; ``None``, если ресурса нет."""
+    if any(parts is None for _, parts in states):
+        return None
+    return states
+
+
+def first_or_404(rows) -> Dict[str, Any]:
+    row = rows.first()
+    if row is None:
+        raise Http404
+    return row
+
+
+def _posts(request: HttpRequest, **filters) -> Dict[str, Any]:
+    return page_payload(
+        paginate(
+            request,
+            Post.objects.filter(**filters).values(*POST_FIELDS),
+            transform=post_row,
+        ),
+    )
+
+
+@require_safe
+def posts(request: HttpRequest) -> HttpResponse:
+    return respond(
+        request,
+        freshness.index(request),
+        lambda: _posts(request),
+    )
+
+
+@require_safe
+def post(request: HttpRequest, pk: int) -> HttpResponse:
+    return respond(
+        request,
+        found(freshness.post_detail(request, pk)),
+        lambda: post_row(
+            first_or_404(Post.objects.filter(pk=pk).values(*POST_FIELDS)),
+        ),
+    )
+
+
+@require_safe
+def comments(request: HttpRequest, pk: int) -> HttpResponse:
+    state = found(freshness.post_detail(request, pk))
+    if state is None:
+        raise Http404
+    return respond(
+        request,
+        state,
+        lambda: page_payload(
+            paginate(
+                request,
+                Comment.objects.filter(post_id=pk).values(*COMMENT_FIELDS),
+                settings.COMMENTS_PER_PAGE,
+                keys=('created', 'pk'),
+                transform=comment_row,
+            ),
+        ),
+    )
+
+
+@require_safe
+def groups(request: HttpRequest) -> HttpResponse:
+    return respond(
+        request,
+        (
+            Group.objects.aggregate(modified=Max('updated'))['modified'],
+            get_generation('posts'),
+        ),
+        lambda: list(Group.objects.order_by('title').values(*GROUP_FIELDS)),
+    )
+
+
+@require_safe
+def group(request: HttpRequest, slug: str) -> HttpResponse:
+    return respond(
+        request,
+        found(freshness.group(request, slug), freshness.index(request)),
+        lambda: {
+            **first_or_404(
+                Group.objects.filter(slug=slug).values(*GROUP_FIELDS),
+            ),
+            'posts': _posts(request, group__slug=slug),
+        },
+    )
+
+
+@require_safe
+def profile(request: HttpRequest, username: str) -> HttpResponse:
+    return respond(
+        request,
+        found(
+            freshness.profile(request, username),
+            freshness.index(request),
+        ),
+        lambda: {
+            **profile_row(
+                first_or_404(
+                    User.objects.filter(username=username).values(
+                        *PROFILE_FIELDS,
+                    ),
+                ),
+            ),
+            'posts': _posts(request, author__username=username),
+        },
+    )
+
+
+def _follow(request: HttpRequest) -> CursorPage:
+    return paginate(
+        request,
+        TimelineEntry.objects.filter(user=request.user).values(
+            *timeline.KEYS,
+            *(f'post__{field}' for field in POST_FIELDS[1:]),
+        ),
+        keys=timeline.KEYS,
+        transform=timeline_row,
+        extra=timeline.pull_values(request.user, *POST_FIELDS[1:]),
+    )
+
+
+@require_safe
+def follow(request: HttpRequest) -> HttpResponse:
+    if not request.user.is_authenticated:
+        return JsonResponse(
+            {'detail': 'Требуется вход'},
+            status=401,
+            json_dumps_params={'ensure_ascii': False},
+        )
+    return respond(
+        request,
+        (
+            request.user.pk,
+            follow_graph.following_ids(request.user).tolist(),
+            freshness.index(request),
+            TimelineEntry.objects.filter(user=request.user).aggregate(
+                newest=Max('pk'),
+            )['newest'],
+        ),
+        lambda: page_payload(_follow(request)),
+    )
+
@@ -0,0 +1,166 @@
+"""Асинхронные версии страниц только для чтения.
+
+Подключаются вместо ``posts.views`` при ASYNC_VIEWS = True и имеют смысл
+под ASGI-сервером (``yatube/asgi.py``). ORM в Django синхронный, поэтому
+вся работа с БД, кэшем и шаблонами идёт через ``core.executor``, а
+независимые части страницы запрашиваются одновременно.
+"""
+import asyncio
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404, render
+
+from core import executor
+from core.cache import cache_anonymous_page, conditional_page
+from core.paginator import CursorPage
+from core.utils import paginate
+from posts import follow_graph, freshness, live, timeline
+from posts.forms import CommentForm
+from posts.models import Comment, Group, Post, User
+
+
+def _timeline(request: HttpRequest) -> Optional[CursorPage]:
+    if not request.user.is_authenticated:
+        return None
+    entries, pulled = timeline.feed(request.user)
+    return paginate(
+        request,
+        entries,
+        keys=timeline.KEYS,
+        transform=lambda entry: entry.post,
+        extra=pulled,
+    )
+
+
+@cache_anonymous_page('posts')
+@conditional_page(freshness.index)
+async def index(request: HttpRequest) -> HttpResponse:
+    page = await executor.run(
+        paginate,
+        request,
+        Post.objects.select_related('author', 'group'),
+    )
+    return await executor.run(
+        render,
+        request,
+        'posts/index.html',
+        {'page_obj': page},
+    )
+
+
+@cache_anonymous_page('posts')
+@conditional_page(freshness.group)
+async def group_posts(request: HttpRequest, slug: str) -> HttpResponse:
+    group, page = await asyncio.gather(
+        executor.run(get_object_or_404, Group, slug=slug),
+        executor.run(
+            paginate,
+            request,
+            Post.objects.filter(group__slug=slug).select_related(
+                'author',
+                'group',
+            ),
+            count=True,
+        ),
+    )
+    return await executor.run(
+        render,
+        request,
+        'posts/group_list.html',
+        {'group': group, 'page_obj': page},
+    )
+
+
+@conditional_page(freshness.profile)
+async def profile(request: HttpRequest, username: str) -> HttpResponse:
+    author, page = await asyncio.gather(
+        executor.run(
+            get_object_or_404,
+            User.objects.select_related('profile'),
+            username=username,
+        ),
+        executor.run(
+            paginate,
+            request,
+            Post.objects.filter(author__username=username).select_related(
+                'author',
+                'group',
+            ),
+            count=True,
+        ),
+    )
+    following = await executor.run(
+        follow_graph.is_following,
+        request.user,
+        author.pk,
+    )
+    return await executor.run(
+        render,
+        request,
+        'posts/profile.html',
+        {'author': author, 'page_obj': page, 'following': following},
+    )
+
+
+@conditional_page(freshness.post_detail)
+async def post_detail(request: HttpRequest, pk: int) -> HttpResponse:
+    post, page = await asyncio.gather(
+        executor.run(
+            get_object_or_404,
+            Post.objects.select_related('author', 'group'),
+            pk=pk,
+        ),
+        executor.run(
+            paginate,
+            request,
+            Comment.objects.filter(post_id=pk).select_related('author'),
+            settings.COMMENTS_PER_PAGE,
+            keys=('created', 'pk'),
+        ),
+    )
+    return await executor.run(
+        render,
+        request,
+        'posts/post_detail.html',
+        {
+            'post': post,
+            'body_timeout': settings.POST_CARD_CACHE_TIMEOUT,
+            'form': CommentForm(),
+            'page_obj': page,
+        },
+    )
+
+
+async def follow_index(request: HttpRequest) -> HttpResponse:
+    page = await executor.run(_timeline, request)
+    if page is None:
+        return redirect_to_login(request.get_full_path())
+    return await executor.run(
+        render,
+        request,
+        'posts/follow.html',
+        {'page_obj': page},
+    )
+
+
+async def live_poll(request: HttpRequest) -> JsonResponse:
+    """Длинный опрос новых постов в ленте.
+
+    Ждёт постов после курсора ``after`` не дольше LIVE_POLL_TIMEOUT; без
+    ``after`` сразу отдаёт текущий курсор. Под WSGI не ждёт вовсе, чтобы
+    не держать поток воркера.
+    """
+    last, channels = await executor.run(live.subscribe, request)
+    events = (
+        await live.BROKER.wait_async(
+            last,
+            channels,
+            settings.LIVE_POLL_TIMEOUT if live.served_async(request) else 0,
+        )
+        if 'after' in request.GET
+        else []
+    )
+    return JsonResponse(await executor.run(live.message, last, events))
@@ -0,0 +1,182 @@
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from faker import Faker
+from mixer.backend.django import mixer
+
+from posts.models import Comment, Follow, Group, Post, User
+
+METRICS = ('p50_ms', 'p95_ms', 'queries', 'memory_kb')
+
+
+def seed(
+    users: int,
+    groups: int,
+    posts: int,
+    comments: int,
+    follows: int,
+    seed: int = 0,
+) -> None:
+    """Заполняет базу воспроизводимым набором данных.
+
+    Посты, комментарии и подписки создаются по одному, чтобы сработали
+    сигналы: ленты подписок, счётчики комментариев и поисковый индекс
+    заполняются как в жизни.
+    """
+    rng = random.Random(seed)
+    fake = Faker('ru_RU')
+    fake.seed_instance(seed)
+    authors = mixer.cycle(users).blend(User)
+    communities = mixer.cycle(groups).blend(Group) if groups else []
+    created = [
+        Post.objects.create(
+            author=rng.choice(authors),
+            group=rng.choice(communities + [None]),
+            text=fake.text(),
+        )
+        for _ in range(posts)
+    ]
+    for _ in range(comments):
+        Comment.objects.create(
+            post=rng.choice(created),
+            author=rng.choice(authors),
+            text=fake.sentence(),
+        )
+    for user in authors:
+        for author in rng.sample(authors, min(follows, len(authors))):
+            if author != user:
+                Follow.objects.get_or_create(user=user, author=author)
+
+
+@contextmanager
+def temporary_database() -> Iterator[str]:
+    """Переключает основную базу на пустой временный файл SQLite.
+
+    Для замеров под параллельной нагрузкой: тестовая база в памяти не
+    видна соединениям других потоков.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'benchmark.sqlite3')
+        connections.close_all()
+        settings_dict = connection.settings_dict
+        original = settings_dict['NAME']
+        settings_dict['NAME'] = path
+        try:
+            call_command('migrate', verbosity=0)
+            yield path
+        finally:
+            connections.close_all()
+            settings_dict['NAME'] = original
+
+
+def percentile(values: List[float], percent: int) -> float:
+    values = sorted(values)
+    return values[max(round(len(values) * percent / 100) - 1, 0)]
+
+
+def targets() -> List[Tuple[str, str, Client]]:
+    anon = Client()
+    reader = Client()
+    user = Follow.objects.values_list('user', flat=True).first()
+    if user is not None:
+        reader.force_login(User.objects.get(pk=user))
+    post = Post.objects.order_by('-comments_count').first()
+    group = Group.objects.first()
+    author = User.objects.order_by('-profile__posts_count').first()
+    views = [
+        ('posts:index', reverse('posts:index'), anon),
+        (
+            'posts:profile',
+            reverse('posts:profile', args=(author.username,)),
+            anon,
+        ),
+        (
+            'posts:post_detail',
+            reverse('posts:post_detail', args=(post.pk,)),
+            anon,
+        ),
+        ('posts:follow_index', reverse('posts:follow_index'), reader),
+    ]
+    if group is not None:
+        views.insert(
+            1,
+            (
+                'posts:group_list',
+                reverse('posts:group_list', args=(group.slug,)),
+                anon,
+            ),
+        )
+    return views
+
+
+def measure(
+    client: Client,
+    url: str,
+    repeat: int,
+    warm: bool = False,
+) -> Dict[str, float]:
+    """Время, число запросов к БД и пик памяти одного view.
+
+    Первый запрос прогревает импорты и шаблоны и в замер не входит.
+    Память снимается отдельным проходом: tracemalloc заметно
+    замедляет код и исказил бы замер времени.
+    """
+    client.get(url)
+    timings = []
+    queries = 0
+    for _ in range(repeat):
+        if not warm:
+            cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            raise AssertionError(f'{url}: {response.status_code}')
+        queries = max(queries, len(context.captured_queries))
+    if not warm:
+        cache.clear()
+    tracemalloc.start()
+    try:
+        client.get(url)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'p50_ms': percentile(timings, 50),
+        'p95_ms': percentile(timings, 95),
+        'queries': queries,
+        'memory_kb': peak / 1024,
+    }
+
+
+def run(repeat: int, warm: bool = False) -> Dict[str, Dict[str, float]]:
+    return {
+        name: measure(client, url, repeat, warm)
+        for name, url, client in targets()
+    }
+
+
+def regressions(
+    results: Dict[str, Dict[str, float]],
+    budgets: Optional[Dict[str, Dict[str, float]]] = None,
+) -> List[str]:
+    budgets = settings.BENCHMARK_BUDGETS if budgets is None else budgets
+    return [
+        f'{name}: {metric} {result[metric]:.1f} > {limit}'
+        for name, result in results.items()
+        for metric, limit in budgets.get(name, {}).items()
+        if result[metric] > limit
+    ]
@@ -0,0 +1,39 @@
+from typing import Iterable, List, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import SafeString, mark_safe
+
+from core import metrics, thumbnails
+from posts.models import Post
+
+CARD_TEMPLATE = 'posts/includes/post.html'
+
+
+def card_key(post: Post) -> str:
+    return f'post-card:{post.cache_key}'
+
+
+def render_cards(posts: Iterable[Post]) -> List[Tuple[Post, SafeString]]:
+    """Отдаёт карточки постов страницы за одно обращение к кэшу.
+
+    Недостающие карточки рендерятся и записываются одним set_many;
+    карточки с оригиналом вместо ещё не готовой миниатюры не кэшируются.
+    """
+    posts = {card_key(post): post for post in posts}
+    cards = cache.get_many(posts)
+    missing = {}
+    ready = {}
+    for key, post in posts.items():
+        if key in cards:
+            continue
+        with thumbnails.track_fallbacks() as fallbacks:
+            missing[key] = render_to_string(CARD_TEMPLATE, {'post': post})
+        if not fallbacks:
+            ready[key] = missing[key]
+    metrics.cache_access(len(cards), len(missing))
+    if ready:
+        cache.set_many(ready, settings.POST_CARD_CACHE_TIMEOUT)
+    cards.update(missing)
+    return [(post, mark_safe(cards[key])) for key, post in posts.items()]
@@ -0,0 +1,74 @@
+from typing import Any, Dict
+
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.db.models import Count, F, OuterRef, QuerySet, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def changed() -> Dict[str, Any]:
+    """Поля ``VersionedModel``, отмечающие новую версию в UPDATE."""
+    return {'version': F('version') + 1, 'updated': timezone.now()}
+
+
+def touch(queryset: QuerySet) -> None:
+    queryset.update(**changed())
+
+
+def bump(queryset: QuerySet, field: str, delta: int = 1) -> None:
+    """Сдвигает счётчик и поднимает версию записи одним UPDATE."""
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta}, **changed())
+
+
+def _count(queryset: QuerySet, field: str) -> Coalesce:
+    return Coalesce(
+        Subquery(
+            queryset.order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total'),
+        ),
+        0,
+    )
+
+
+def recount(apps=django_apps) -> None:
+    """Пересчитывает все денормализованные счётчики одним проходом."""
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    Profile = apps.get_model('posts', 'Profile')
+    Profile.objects.bulk_create(
+        (
+            Profile(user_id=user_id)
+            for user_id in User.objects.filter(
+                profile__isnull=True,
+            ).values_list('pk', flat=True)
+        ),
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    Profile.objects.update(
+        posts_count=_count(
+            Post.objects.filter(author=OuterRef('user')),
+            'author',
+        ),
+        followers_count=_count(
+            Follow.objects.filter(author=OuterRef('user')),
+            'author',
+        ),
+        following_count=_count(
+            Follow.objects.filter(user=OuterRef('user')),
+            'user',
+        ),
+    )
+    Post.objects.update(
+        comments_count=_count(
+            Comment.objects.filter(post=OuterRef('pk')),
+            'post',
+        ),
+    )
@@ -0,0 +1,69 @@
+"""Подписки пользователей в кэше в виде отсортированных массивов.
+
+Подписки пользователя хранятся одной записью кэша: упакованным
+``array('q')`` идентификаторов авторов по возрастанию, восемь байт на
+подписку. Список подписок отдаётся без запросов к БД, проверка подписки
+на автора идёт двоичным поиском за O(log n). Запись сбрасывается
+сигналами ``Follow`` при подписке и отписке; внутри запроса массив
+запоминается на объекте пользователя. Запись в кэш всегда строится по
+основной базе: отставшая реплика вернула бы в кэш старые подписки.
+"""
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core import routers
+from posts.models import Follow, User
+
+
+def _key(user_id: int) -> str:
+    return f'following:{user_id}'
+
+
+def _load(user_id: int) -> array:
+    packed = cache.get(_key(user_id))
+    if packed is not None:
+        ids = array('q')
+        ids.frombytes(packed)
+        return ids
+    ids = array(
+        'q',
+        Follow.objects.using(routers.PRIMARY)
+        .filter(user_id=user_id)
+        .order_by('author_id')
+        .values_list('author_id', flat=True),
+    )
+    cache.set(
+        _key(user_id),
+        ids.tobytes(),
+        settings.FOLLOW_GRAPH_CACHE_TIMEOUT,
+    )
+    return ids
+
+
+def following_ids(user: User) -> array:
+    """Идентификаторы авторов, на которых подписан пользователь."""
+    if not user.is_authenticated:
+        return array('q')
+    if not hasattr(user, '_following_ids'):
+        user._following_ids = _load(user.pk)
+    return user._following_ids
+
+
+def is_following(user: User, author_id: int) -> bool:
+    ids = following_ids(user)
+    position = bisect_left(ids, author_id)
+    return position < len(ids) and ids[position] == author_id
+
+
+def invalidate(user_id: int) -> None:
+    """Сбрасывает подписки сразу и ещё раз после фиксации транзакции.
+
+    Второй сброс убирает запись, которую параллельный запрос мог
+    положить в кэш по ещё не зафиксированному состоянию.
+    """
+    cache.delete(_key(user_id))
+    transaction.on_commit(lambda: cache.delete(_key(user_id)))
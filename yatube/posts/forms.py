@@ -1,5 +1,10 @@
+from typing import Any, Dict, Optional
+
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image
 
+from core.images import normalize_image
 from posts.models import Comment, Post
 
 
@@ -12,6 +17,41 @@ class PostForm(forms.ModelForm):
             "group": "Группа, к которой будет относиться пост",
         }
 
+    def __init__(
+        self,
+        *args: Any,
+        upload_errors: Optional[Dict[Optional[str], str]] = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.upload_errors = upload_errors or {}
+        if self.upload_errors:
+            # Отброшенный целиком запрос приходит без полей формы.
+            self.is_bound = True
+
+    def clean(self) -> Dict[str, Any]:
+        cleaned_data = super().clean()
+        for field, message in self.upload_errors.items():
+            self.add_error(field if field in self.fields else None, message)
+        return cleaned_data
+
+    def clean_image(self) -> UploadedFile:
+        image = self.cleaned_data.get("image")
+        if isinstance(image, UploadedFile):
+            try:
+                image = normalize_image(image)
+            except (OSError, Image.DecompressionBombError) as error:
+                raise forms.ValidationError(
+                    "Не удалось прочитать картинку.",
+                ) from error
+            (
+                self.instance.image_width,
+                self.instance.image_height,
+            ) = image.image.size
+        elif not image:
+            self.instance.image_width = self.instance.image_height = None
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,75 @@
+"""Дешёвые отметки последнего изменения страниц для ``conditional_page``.
+
+Каждая функция делает один запрос по индексам и не загружает ни постов
+страницы, ни комментариев. Посты, группы и профили несут ``updated`` и
+``version`` (``core.models.VersionedModel``), которые поднимаются при
+правке поста, новом комментарии и изменении ленты группы или автора.
+"""
+from typing import Any, Optional
+
+from django.db.models import Max, QuerySet
+from django.http import HttpRequest
+
+from core.cache import PageState, get_generation
+from posts import follow_graph
+from posts.models import Group, Post, User
+
+
+def _row(rows: QuerySet) -> Optional[Any]:
+    return next(iter(rows.order_by()[:1]), None)
+
+
+def _state(rows: QuerySet) -> PageState:
+    row = _row(rows)
+    return (row[0], row[1:]) if row else (None, None)
+
+
+def index(request: HttpRequest) -> PageState:
+    """Удаление поста не двигает ``updated``, его ловит поколение кэша."""
+    modified = Post.objects.aggregate(modified=Max('updated'))['modified']
+    return modified, get_generation('posts')
+
+
+def group(request: HttpRequest, slug: str) -> PageState:
+    return _state(
+        Group.objects.filter(slug=slug).values_list('updated', 'version'),
+    )
+
+
+def profile(request: HttpRequest, username: str) -> PageState:
+    modified, parts = _state(
+        User.objects.filter(username=username).values_list(
+            'profile__updated',
+            'pk',
+            'profile__version',
+            'first_name',
+            'last_name',
+        ),
+    )
+    if parts is None:
+        return modified, parts
+    return modified, (
+        follow_graph.is_following(request.user, parts[0]),
+        *parts,
+    )
+
+
+def post_detail(request: HttpRequest, pk: int) -> PageState:
+    """Вошедшему пользователю страница отдаёт форму с CSRF-токеном.
+
+    Токен строится из секрета в cookie, так что при его смене страница
+    из кэша браузера отправила бы форму со старым токеном.
+    """
+    modified, parts = _state(
+        Post.objects.filter(pk=pk).values_list(
+            'updated',
+            'version',
+            'group__version',
+            'author__username',
+            'author__first_name',
+            'author__last_name',
+        ),
+    )
+    if parts is None or not request.user.is_authenticated:
+        return modified, parts
+    return modified, (request.META.get('CSRF_COOKIE'), *parts)
@@ -0,0 +1,289 @@
+"""Живые обновления лент: рассылка о новых постах внутри процесса.
+
+Создание поста публикует событие в каналы ``index``, ``group:<id>`` и
+``author:<id>``; лента подписок слушает каналы авторов, на которых
+подписан пользователь. Клиенты получают события потоком SSE по ``PATH``
+(только под ASGI, см. ``yatube.asgi``) или длинным опросом, а вместо
+перезагрузки страницы вставляют готовые карточки. Под WSGI и поток
+SSE, и длинный опрос держали бы поток воркера на всё время ожидания,
+поэтому там живые обновления выключены: баннер не выводится, а опрос
+отвечает сразу.
+
+Рассылка живёт в памяти процесса: при нескольких процессах клиент видит
+только посты, созданные в том же процессе, что и его соединение.
+"""
+import asyncio
+import json
+import threading
+from collections import deque
+from importlib import import_module
+from io import BytesIO
+from typing import (
+    AsyncIterator,
+    Deque,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from django.conf import settings
+from django.contrib import auth
+from django.core.exceptions import PermissionDenied
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpRequest
+from django.shortcuts import get_object_or_404
+
+from core import executor
+from posts import cards, follow_graph
+from posts.models import Group, Post, User
+
+INDEX = frozenset({'index'})
+FEEDS = ('index', 'group', 'follow')
+PING = b': ping\n\n'
+PATH = '/live/'
+
+Event = Tuple[int, int]
+Waiter = Tuple[asyncio.AbstractEventLoop, asyncio.Event]
+
+
+class Broker:
+    """Последние LIVE_BUFFER_SIZE событий в кольцевом буфере.
+
+    Номер события служит курсором: клиент, переподключившийся с
+    Last-Event-ID, получает пропущенное из буфера. Подписчики ждут на
+    asyncio.Event своего цикла событий.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.events: Deque[Tuple[int, FrozenSet[str], int]] = deque(
+            maxlen=size,
+        )
+        self.last = 0
+        self.lock = threading.Lock()
+        self.waiters: Set[Waiter] = set()
+
+    def publish(self, channels: Iterable[str], post_id: int) -> int:
+        with self.lock:
+            self.last += 1
+            self.events.append((self.last, frozenset(channels), post_id))
+            waiters = list(self.waiters)
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass
+        return self.last
+
+    def cursor(self, last: Optional[int]) -> int:
+        """Курсор клиента; номера из прошлой жизни процесса сбрасываются."""
+        with self.lock:
+            if last is None or last > self.last:
+                return self.last
+            return last
+
+    def since(self, last: int, channels: FrozenSet[str]) -> List[Event]:
+        found = []
+        with self.lock:
+            for number, targets, post_id in reversed(self.events):
+                if number <= last:
+                    break
+                if targets & channels:
+                    found.append((number, post_id))
+        found.reverse()
+        return found
+
+    async def wait_async(
+        self,
+        last: int,
+        channels: FrozenSet[str],
+        timeout: float,
+    ) -> List[Event]:
+        loop = asyncio.get_running_loop()
+        waiter = (loop, asyncio.Event())
+        deadline = loop.time() + timeout
+        with self.lock:
+            self.waiters.add(waiter)
+        try:
+            while True:
+                waiter[1].clear()
+                found = self.since(last, channels)
+                remaining = deadline - loop.time()
+                if found or remaining <= 0:
+                    return found
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self.lock:
+                self.waiters.discard(waiter)
+
+
+BROKER = Broker(settings.LIVE_BUFFER_SIZE)
+
+
+def publish(post: Post) -> int:
+    channels = {'index', f'author:{post.author_id}'}
+    if post.group_id is not None:
+        channels.add(f'group:{post.group_id}')
+    return BROKER.publish(channels, post.pk)
+
+
+def served_async(request: HttpRequest) -> bool:
+    """Запрос пришёл через ASGI: ожидание событий не занимает потока."""
+    return isinstance(request, ASGIRequest)
+
+
+def feed_channels(
+    feed: str,
+    slug: Optional[str],
+    user: User,
+) -> FrozenSet[str]:
+    """Каналы ленты; для несуществующей группы Http404."""
+    if feed == 'group':
+        group = get_object_or_404(Group, slug=slug)
+        return frozenset({f'group:{group.pk}'})
+    if feed == 'follow':
+        if not user.is_authenticated:
+            raise PermissionDenied
+        return frozenset(
+            f'author:{author}' for author in follow_graph.following_ids(user)
+        )
+    return INDEX
+
+
+def subscribe(request: HttpRequest) -> Tuple[int, FrozenSet[str]]:
+    """Курсор и каналы ленты по параметрам ``feed``, ``slug`` и ``after``.
+
+    Вместо ``after`` годится заголовок Last-Event-ID, который EventSource
+    сам шлёт при переподключении.
+    """
+    feed = request.GET.get('feed', 'index')
+    if feed not in FEEDS:
+        raise Http404
+    last = request.GET.get('after') or request.headers.get('Last-Event-ID')
+    try:
+        last = int(last) if last else None
+    except ValueError:
+        last = None
+    return (
+        BROKER.cursor(last),
+        feed_channels(feed, request.GET.get('slug'), request.user),
+    )
+
+
+def message(last: int, events: List[Event]) -> Dict:
+    """Число новых постов и карточки последних LIVE_MAX_CARDS из них."""
+    posts = Post.objects.filter(
+        pk__in=[post_id for _, post_id in events[-settings.LIVE_MAX_CARDS:]],
+    ).select_related('author', 'group')
+    return {
+        'last': events[-1][0] if events else last,
+        'count': len(events),
+        'cards': [
+            str(card)
+            for _, card in cards.render_cards(
+                sorted(posts, key=lambda post: post.pub_date, reverse=True),
+            )
+        ],
+    }
+
+
+def _event(data: Dict) -> bytes:
+    return 'id: {}\nevent: posts\ndata: {}\n\n'.format(
+        data['last'],
+        json.dumps(data, ensure_ascii=False),
+    ).encode()
+
+
+def _retry() -> bytes:
+    return f'retry: {settings.LIVE_RETRY_MS}\n\n'.encode()
+
+
+async def astream(
+    last: int,
+    channels: FrozenSet[str],
+) -> AsyncIterator[bytes]:
+    """Поток SSE: ожидание не занимает потоков."""
+    yield _retry()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.LIVE_STREAM_SECONDS
+    while True:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return
+        events = await BROKER.wait_async(
+            last,
+            channels,
+            min(settings.LIVE_HEARTBEAT_SECONDS, remaining),
+        )
+        if events:
+            data = await executor.run(message, last, events)
+            last = data['last']
+            yield _event(data)
+        else:
+            yield PING
+
+
+def _authenticate(request: HttpRequest) -> Tuple[int, FrozenSet[str]]:
+    engine = import_module(settings.SESSION_ENGINE)
+    request.session = engine.SessionStore(
+        request.COOKIES.get(settings.SESSION_COOKIE_NAME),
+    )
+    request.user = auth.get_user(request)
+    return subscribe(request)
+
+
+async def _respond(send, status: int) -> None:
+    await send({'type': 'http.response.start', 'status': status})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def application(scope: Dict, receive, send) -> None:
+    """SSE под ASGI в обход обработчика Django.
+
+    Django 3.2 читает потоковый ответ под ASGI синхронно прямо в цикле
+    событий, и каждое ожидание нового поста останавливало бы весь
+    сервер. Здесь поток отдаётся асинхронно, а обрыв соединения
+    клиентом замечается не позже чем через LIVE_HEARTBEAT_SECONDS.
+    """
+    await receive()
+    request = ASGIRequest(scope, BytesIO())
+    try:
+        last, targets = await executor.run(_authenticate, request)
+    except Http404:
+        await _respond(send, 404)
+        return
+    except PermissionDenied:
+        await _respond(send, 403)
+        return
+    await send(
+        {
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        },
+    )
+    disconnect = asyncio.ensure_future(receive())
+    try:
+        async for chunk in astream(last, targets):
+            if disconnect.done():
+                return
+            await send(
+                {
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                },
+            )
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        disconnect.cancel()
@@ -0,0 +1,192 @@
+import asyncio
+import importlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test.utils import override_settings
+from django.urls import clear_url_caches
+
+from posts import benchmark
+
+Target = Tuple[str, str]
+Result = Tuple[float, int]
+
+
+def use_views(asynchronous: bool) -> None:
+    """Пересобирает маршруты с синхронными или асинхронными страницами."""
+    with override_settings(ASYNC_VIEWS=asynchronous):
+        importlib.reload(importlib.import_module('posts.urls'))
+        importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+    clear_url_caches()
+
+
+def wsgi_client(
+    handler: WSGIHandler,
+    targets: List[Target],
+    offset: int,
+    deadline: float,
+) -> List[Result]:
+    results = []
+    statuses = []
+    try:
+        while time.perf_counter() < deadline:
+            path, cookie = targets[offset % len(targets)]
+            offset += 1
+            environ = {
+                'REQUEST_METHOD': 'GET',
+                'PATH_INFO': path,
+                'HTTP_COOKIE': cookie,
+                'SERVER_NAME': 'testserver',
+                'SERVER_PORT': '80',
+                'wsgi.input': BytesIO(),
+                'wsgi.url_scheme': 'http',
+            }
+            start = time.perf_counter()
+            response = handler(
+                environ,
+                lambda status, headers: statuses.append(int(status[:3])),
+            )
+            b''.join(response)
+            response.close()
+            results.append((time.perf_counter() - start, statuses.pop()))
+    finally:
+        connections.close_all()
+    return results
+
+
+async def asgi_client(
+    handler: ASGIHandler,
+    targets: List[Target],
+    offset: int,
+    deadline: float,
+) -> List[Result]:
+    results = []
+    statuses = []
+
+    async def receive() -> Dict:
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message: Dict) -> None:
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+
+    while time.perf_counter() < deadline:
+        path, cookie = targets[offset % len(targets)]
+        offset += 1
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'root_path': '',
+            'query_string': b'',
+            'headers': [
+                (b'host', b'testserver'),
+                (b'cookie', cookie.encode()),
+            ],
+            'server': ('testserver', 80),
+            'client': ('127.0.0.1', 0),
+        }
+        start = time.perf_counter()
+        await handler(scope, receive, send)
+        results.append((time.perf_counter() - start, statuses.pop()))
+    return results
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность страниц чтения: синхронные '
+        'представления под WSGI против асинхронных под ASGI'
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--posts', type=int, default=500)
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.ASYNC_DB_WORKERS,
+            help='Размер пула потоков для ORM под ASGI',
+        )
+
+    def handle(self, *args, **options) -> None:
+        overrides = {
+            'ASYNC_DB_WORKERS': options['workers'],
+            'MIDDLEWARE': [
+                name
+                for name in settings.MIDDLEWARE
+                if not name.startswith('debug_toolbar')
+            ],
+            'PAGE_CACHE_TIMEOUT': 0,
+            'REPLICA_DATABASES': [],
+        }
+        with override_settings(**overrides), benchmark.temporary_database():
+            benchmark.seed(
+                users=20,
+                groups=3,
+                posts=options['posts'],
+                comments=options['posts'] * 2,
+                follows=3,
+            )
+            targets = [
+                (
+                    url,
+                    '; '.join(
+                        f'{name}={morsel.value}'
+                        for name, morsel in client.cookies.items()
+                    ),
+                )
+                for view, url, client in benchmark.targets()
+            ]
+            connections.close_all()
+            try:
+                use_views(False)
+                self.report('WSGI', self.wsgi(targets, options), options)
+                use_views(True)
+                self.report('ASGI', self.asgi(targets, options), options)
+            finally:
+                use_views(settings.ASYNC_VIEWS)
+
+    def wsgi(self, targets: List[Target], options: Dict) -> List[Result]:
+        handler = WSGIHandler()
+        deadline = time.perf_counter() + options['seconds']
+        with ThreadPoolExecutor(options['concurrency']) as pool:
+            futures = [
+                pool.submit(wsgi_client, handler, targets, offset, deadline)
+                for offset in range(options['concurrency'])
+            ]
+        return [result for future in futures for result in future.result()]
+
+    def asgi(self, targets: List[Target], options: Dict) -> List[Result]:
+        handler = ASGIHandler()
+        deadline = time.perf_counter() + options['seconds']
+
+        async def run() -> List[List[Result]]:
+            return await asyncio.gather(
+                *(
+                    asgi_client(handler, targets, offset, deadline)
+                    for offset in range(options['concurrency'])
+                ),
+            )
+
+        return [result for client in asyncio.run(run()) for result in client]
+
+    def report(self, mode: str, results: List[Result], options: Dict) -> None:
+        durations = [duration * 1000 for duration, _ in results]
+        errors = sum(status != 200 for _, status in results)
+        self.stdout.write(
+            f'{mode}: {len(results) / options["seconds"]:.0f} запр/с, '
+            f'p50 {benchmark.percentile(durations, 50):.1f} мс, '
+            f'p95 {benchmark.percentile(durations, 95):.1f} мс, '
+            f'ошибок {errors}',
+        )
@@ -0,0 +1,109 @@
+import threading
+import time
+from typing import Callable, Dict
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections, transaction
+from django.test.utils import override_settings
+
+from posts import benchmark
+from posts.models import Comment, Post, User
+
+
+def worker(action: Callable, stop: threading.Event, stats: Dict) -> None:
+    done = errors = 0
+    try:
+        while not stop.is_set():
+            try:
+                action()
+                done += 1
+            except OperationalError:
+                errors += 1
+    finally:
+        connections.close_all()
+        with stats['lock']:
+            stats['done'] += done
+            stats['errors'] += errors
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет пропускную способность чтения ленты при параллельной '
+        'записи комментариев во временную файловую базу SQLite'
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--posts', type=int, default=500)
+        parser.add_argument(
+            '--defaults',
+            action='store_true',
+            help='Без SQLITE_PRAGMAS: журнал DELETE, synchronous=FULL',
+        )
+
+    def handle(self, *args, **options) -> None:
+        overrides = (
+            {
+                'SQLITE_PRAGMAS': {
+                    'journal_mode': 'delete',
+                    'synchronous': 'full',
+                },
+            }
+            if options['defaults']
+            else {}
+        )
+        with override_settings(**overrides), benchmark.temporary_database():
+            self.run(options)
+
+    def run(self, options: Dict) -> None:
+        benchmark.seed(
+            users=20,
+            groups=3,
+            posts=options['posts'],
+            comments=0,
+            follows=3,
+        )
+        post = Post.objects.first()
+        author = User.objects.first()
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            journal = cursor.fetchone()[0]
+        connection.close()
+
+        def read() -> None:
+            list(Post.objects.select_related('author', 'group')[:10])
+            list(post.comments.select_related('author')[:20])
+
+        def write() -> None:
+            with transaction.atomic():
+                Comment.objects.create(post=post, author=author, text='Тест')
+
+        stop = threading.Event()
+        reads = {'lock': threading.Lock(), 'done': 0, 'errors': 0}
+        writes = {'lock': threading.Lock(), 'done': 0, 'errors': 0}
+        threads = [
+            threading.Thread(target=worker, args=(read, stop, reads))
+            for _ in range(options['readers'])
+        ] + [
+            threading.Thread(target=worker, args=(write, stop, writes))
+            for _ in range(options['writers'])
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(options['seconds'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        seconds = options['seconds']
+        self.stdout.write(f'Журнал: {journal}')
+        self.stdout.write(
+            f'Чтение: {reads["done"] / seconds:.0f} оп/с, '
+            f'ошибок {reads["errors"]}',
+        )
+        self.stdout.write(
+            f'Запись: {writes["done"] / seconds:.0f} оп/с, '
+            f'ошибок {writes["errors"]}',
+        )
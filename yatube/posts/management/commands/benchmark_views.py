@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время, число запросов и память view постов '
+        'на тестовой базе и сверяет их с BENCHMARK_BUDGETS'
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--groups', type=int, default=5)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=2000)
+        parser.add_argument('--follows', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--warm',
+            action='store_true',
+            help='Не сбрасывать кэш между запросами',
+        )
+        parser.add_argument(
+            '--no-budgets',
+            action='store_true',
+            help='Только отчёт, без проверки бюджетов',
+        )
+
+    def handle(self, *args, **options) -> None:
+        setup_test_environment(debug=False)
+        databases = setup_databases(
+            verbosity=options['verbosity'],
+            interactive=False,
+        )
+        try:
+            benchmark.seed(
+                options['users'],
+                options['groups'],
+                options['posts'],
+                options['comments'],
+                options['follows'],
+                options['seed'],
+            )
+            results = benchmark.run(options['repeat'], options['warm'])
+        finally:
+            teardown_databases(databases, verbosity=options['verbosity'])
+            teardown_test_environment()
+
+        self.stdout.write(
+            f'{"view":<22}'
+            + ''.join(f'{metric:>12}' for metric in benchmark.METRICS),
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<22}'
+                + ''.join(
+                    f'{result[metric]:>12.1f}' for metric in benchmark.METRICS
+                ),
+            )
+        if options['no_budgets']:
+            return
+        failed = benchmark.regressions(results)
+        if failed:
+            raise CommandError(
+                'Превышены бюджеты:\n' + '\n'.join(failed),
+            )
+        self.stdout.write(self.style.SUCCESS('Бюджеты соблюдены'))
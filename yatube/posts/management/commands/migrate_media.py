@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core import storage
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Переносит картинки постов в контентно-адресуемое хранилище'
+
+    def handle(self, *args, **options) -> None:
+        field = Post._meta.get_field('image')
+        names = (
+            Post.objects.exclude(image='')
+            .values_list('image', flat=True)
+            .distinct()
+            .iterator()
+        )
+        moved = 0
+        for name in names:
+            if field.storage.is_content_name(name):
+                continue
+            if not field.storage.exists(name):
+                self.stderr.write(f'Нет файла {name}')
+                continue
+            with field.storage.open(name) as content:
+                new_name = field.storage.save(name, content)
+            with transaction.atomic():
+                Post.objects.filter(image=name).update(image=new_name)
+            storage.release(Post, 'image', name)
+            moved += 1
+        self.stdout.write(self.style.SUCCESS(f'Перенесено файлов: {moved}'))
@@ -0,0 +1,55 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.seeding import Seeder
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу пользователями, постами и подписками для замеров'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--comments', type=int, default=2000000)
+        parser.add_argument(
+            '--follows',
+            type=int,
+            default=30,
+            help='Среднее число подписок на пользователя',
+        )
+        parser.add_argument('--images', type=int, default=20)
+        parser.add_argument('--image-ratio', type=float, default=0.3)
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Процессы, генерирующие строки; 0 — всё в одном процессе',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options) -> None:
+        start = time.monotonic()
+        Seeder(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows=options['follows'],
+            images=options['images'],
+            image_ratio=options['image_ratio'],
+            days=options['days'],
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            seed=options['seed'],
+            log=self.stdout.write,
+        ).run()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'База заполнена за {time.monotonic() - start:.1f} с',
+            ),
+        )
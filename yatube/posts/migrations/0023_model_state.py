@@ -0,0 +1,101 @@
+# Generated by Django 3.2.10 on 2026-10-18 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0022_auto_20221112_1752"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="comment",
+            options={
+                "default_related_name": "comments",
+                "ordering": ("-created",),
+                "verbose_name": "комментарий",
+                "verbose_name_plural": "комментарии",
+            },
+        ),
+        migrations.AlterModelOptions(
+            name="group",
+            options={
+                "verbose_name": "группа",
+                "verbose_name_plural": "группы",
+            },
+        ),
+        migrations.AlterModelOptions(
+            name="post",
+            options={
+                "default_related_name": "posts",
+                "ordering": ("-pub_date",),
+                "verbose_name": "пост",
+                "verbose_name_plural": "посты",
+            },
+        ),
+        migrations.AlterField(
+            model_name="comment",
+            name="id",
+            field=models.BigAutoField(
+                auto_created=True,
+                primary_key=True,
+                serialize=False,
+                verbose_name="ID",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="comment",
+            name="text",
+            field=models.TextField(
+                help_text="Введите текст поста", verbose_name="текст поста"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="follow",
+            name="id",
+            field=models.BigAutoField(
+                auto_created=True,
+                primary_key=True,
+                serialize=False,
+                verbose_name="ID",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="group",
+            name="id",
+            field=models.BigAutoField(
+                auto_created=True,
+                primary_key=True,
+                serialize=False,
+                verbose_name="ID",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="group",
+            name="slug",
+            field=models.SlugField(unique=True, verbose_name="slug"),
+        ),
+        migrations.AlterField(
+            model_name="post",
+            name="id",
+            field=models.BigAutoField(
+                auto_created=True,
+                primary_key=True,
+                serialize=False,
+                verbose_name="ID",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="post",
+            name="text",
+            field=models.TextField(
+                help_text="Введите текст поста", verbose_name="текст поста"
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="follow",
+            unique_together={("user", "author")},
+        ),
+    ]
@@ -0,0 +1,121 @@
+# Generated by Django 3.2.10 on 2026-10-18 17:40
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def count(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total"),
+        ),
+        0,
+    )
+
+
+def recount(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Post = apps.get_model("posts", "Post")
+    Comment = apps.get_model("posts", "Comment")
+    Follow = apps.get_model("posts", "Follow")
+    Profile = apps.get_model("posts", "Profile")
+    Profile.objects.bulk_create(
+        (
+            Profile(user_id=user_id)
+            for user_id in User.objects.filter(
+                profile__isnull=True,
+            ).values_list("pk", flat=True)
+        ),
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    Profile.objects.update(
+        posts_count=count(
+            Post.objects.filter(author=OuterRef("user")),
+            "author",
+        ),
+        followers_count=count(
+            Follow.objects.filter(author=OuterRef("user")),
+            "author",
+        ),
+        following_count=count(
+            Follow.objects.filter(user=OuterRef("user")),
+            "user",
+        ),
+    )
+    Post.objects.update(
+        comments_count=count(
+            Comment.objects.filter(post=OuterRef("pk")),
+            "post",
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("posts", "0024_timelineentry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="comments_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="число комментариев"
+            ),
+        ),
+        migrations.CreateModel(
+            name="Profile",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "posts_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="число постов"
+                    ),
+                ),
+                (
+                    "followers_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="число подписчиков"
+                    ),
+                ),
+                (
+                    "following_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="число подписок"
+                    ),
+                ),
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="profile",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "профиль",
+                "verbose_name_plural": "профили",
+            },
+        ),
+        migrations.RunPython(recount, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.10 on 2026-10-18 17:45
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0027_post_image_size"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="post",
+            name="image",
+            field=models.ImageField(
+                blank=True,
+                storage=core.storage.ContentAddressedStorage(),
+                upload_to="posts/",
+                verbose_name="картинка",
+            ),
+        ),
+    ]
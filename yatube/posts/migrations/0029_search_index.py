@@ -0,0 +1,39 @@
+"""Таблицы FTS5 для поиска.
+
+Индекс заполняется кодом приложения, а не миграцией: после миграции базы
+с данными выполните ``python manage.py rebuild_search_index``.
+"""
+from django.db import migrations
+
+TOKENIZER = "tokenize='unicode61 remove_diacritics 2', prefix='2 3'"
+
+
+def create_tables(apps, schema_editor) -> None:
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS posts_post_fts "
+        f"USING fts5(body, {TOKENIZER})",
+    )
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS posts_comment_fts "
+        f"USING fts5(body, post_id UNINDEXED, {TOKENIZER})",
+    )
+
+
+def drop_tables(apps, schema_editor) -> None:
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS posts_post_fts")
+    schema_editor.execute("DROP TABLE IF EXISTS posts_comment_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0028_post_image_storage"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_tables, drop_tables),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 3.2.10 on 2026-10-18 18:42
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def published_as_updated(apps, schema_editor):
+    apps.get_model("posts", "Post").objects.update(updated=F("pub_date"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0029_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="group",
+            name="updated",
+            field=models.DateTimeField(auto_now=True, verbose_name="изменено"),
+        ),
+        migrations.AddField(
+            model_name="group",
+            name="version",
+            field=models.PositiveIntegerField(
+                default=1, editable=False, verbose_name="версия"
+            ),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="updated",
+            field=models.DateTimeField(auto_now=True, verbose_name="изменено"),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="version",
+            field=models.PositiveIntegerField(
+                default=1, editable=False, verbose_name="версия"
+            ),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="updated",
+            field=models.DateTimeField(auto_now=True, verbose_name="изменено"),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="version",
+            field=models.PositiveIntegerField(
+                default=1, editable=False, verbose_name="версия"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(fields=["updated"], name="post_updated_idx"),
+        ),
+        migrations.RunPython(published_as_updated, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.10 on 2026-10-18 18:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0030_versions"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(fields=["image"], name="post_image_idx"),
+        ),
+    ]
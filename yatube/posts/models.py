@@ -1,10 +1,11 @@
 from django.db import models
 
-from core.models import BaseModel, User
+from core.models import BaseModel, User, VersionedModel
+from core.storage import ContentAddressedStorage
 from core.utils import cut_text
 
 
-class Group(models.Model):
+class Group(VersionedModel):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True, verbose_name='slug')
     description = models.TextField(verbose_name='группа')
@@ -17,7 +18,7 @@ class Group(models.Model):
         return cut_text(self.title)
 
 
-class Post(BaseModel):
+class Post(BaseModel, VersionedModel):
     pub_date = models.DateTimeField(auto_now_add=True)
     group = models.ForeignKey(
         Group,
@@ -27,10 +28,45 @@ class Post(BaseModel):
         verbose_name='группа',
         help_text='Группа, к которой будет относиться пост',
     )
-    image = models.ImageField('картинка', upload_to='posts/', blank=True)
+    image = models.ImageField(
+        'картинка',
+        upload_to='posts/',
+        storage=ContentAddressedStorage(),
+        blank=True,
+    )
+    image_width = models.PositiveIntegerField(
+        'ширина картинки',
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    image_height = models.PositiveIntegerField(
+        'высота картинки',
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    comments_count = models.PositiveIntegerField(
+        'число комментариев',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(fields=('pub_date',), name='post_pub_date_idx'),
+            models.Index(fields=('updated',), name='post_updated_idx'),
+            models.Index(fields=('image',), name='post_image_idx'),
+            models.Index(
+                fields=('group', 'pub_date'),
+                name='post_group_pub_date_idx',
+            ),
+            models.Index(
+                fields=('author', 'pub_date'),
+                name='post_author_pub_date_idx',
+            ),
+        )
         default_related_name = 'posts'
         verbose_name = 'пост'
         verbose_name_plural = 'посты'
@@ -52,6 +88,12 @@ class Comment(BaseModel):
 
     class Meta:
         ordering = ('-created',)
+        indexes = (
+            models.Index(
+                fields=('post', 'created'),
+                name='comment_post_created_idx',
+            ),
+        )
         default_related_name = 'comments'
         verbose_name = 'комментарий'
         verbose_name_plural = 'комментарии'
@@ -83,3 +125,69 @@ class Follow(models.Model):
 
     def __str__(self) -> str:
         return f'Подписался {self.user} на {self.author}'
+
+
+class Profile(VersionedModel):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='profile',
+        verbose_name='пользователь',
+    )
+    posts_count = models.PositiveIntegerField('число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'число подписчиков',
+        default=0,
+    )
+    following_count = models.PositiveIntegerField('число подписок', default=0)
+
+    class Meta:
+        verbose_name = 'профиль'
+        verbose_name_plural = 'профили'
+
+    def __str__(self) -> str:
+        return f'Профиль {self.user}'
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='читатель',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='пост',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='автор',
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ('-pub_date',)
+        unique_together = (
+            'user',
+            'post',
+        )
+        indexes = (
+            models.Index(
+                fields=('user', 'pub_date', 'post'),
+                name='timeline_user_pub_date_idx',
+            ),
+            models.Index(
+                fields=('user', 'author', 'pub_date'),
+                name='timeline_user_author_idx',
+            ),
+        )
+        verbose_name = 'запись ленты'
+        verbose_name_plural = 'лента подписок'
+
+    def __str__(self) -> str:
+        return f'{self.post} в ленте {self.user}'
@@ -0,0 +1,275 @@
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.db import connection
+from django.utils.functional import cached_property
+
+from posts.models import Comment, Post
+
+POST_TABLE = 'posts_post_fts'
+COMMENT_TABLE = 'posts_comment_fts'
+TOKENIZER = "tokenize='unicode61 remove_diacritics 2', prefix='2 3'"
+
+WORD = re.compile(r'\w+')
+CYRILLIC = re.compile(r'[а-я]')
+VOWELS = 'аеиоуыэюя'
+PERFECTIVE_GERUND = re.compile(
+    r'((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$',
+)
+REFLEXIVE = re.compile(r'(с[яь])$')
+ADJECTIVE = re.compile(
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых|'
+    r'ую|юю|ая|яя|ою|ею)$',
+)
+PARTICIPLE = re.compile(r'((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$')
+VERB = re.compile(
+    r'((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|'
+    r'ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)|((?<=[ая])(ла|на|ете|'
+    r'йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$',
+)
+NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем|'
+    r'ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$',
+)
+DERIVATIONAL = re.compile(r'[^аеиоуыэюя][аеиоуыэюя]+[^аеиоуыэюя]+.*ость?$')
+SUPERLATIVE = re.compile(r'(ейше|ейш)$')
+
+
+def stem(word: str) -> str:
+    """Стеммер Портера для русского языка (алгоритм Snowball)."""
+    word = word.lower().replace('ё', 'е')
+    if not CYRILLIC.search(word):
+        return word
+    position = next(
+        (index + 1 for index, letter in enumerate(word) if letter in VOWELS),
+        None,
+    )
+    if position is None:
+        return word
+    start, rv = word[:position], word[position:]
+    gerund = PERFECTIVE_GERUND.sub('', rv, 1)
+    if gerund != rv:
+        rv = gerund
+    else:
+        rv = REFLEXIVE.sub('', rv, 1)
+        adjective = ADJECTIVE.sub('', rv, 1)
+        if adjective != rv:
+            rv = PARTICIPLE.sub('', adjective, 1)
+        else:
+            verb = VERB.sub('', rv, 1)
+            rv = verb if verb != rv else NOUN.sub('', rv, 1)
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    if DERIVATIONAL.search(rv):
+        rv = re.sub(r'ость?$', '', rv)
+    if rv.endswith('ь'):
+        rv = rv[:-1]
+    else:
+        rv = SUPERLATIVE.sub('', rv, 1)
+        if rv.endswith('нн'):
+            rv = rv[:-1]
+    return start + rv
+
+
+def normalize(text: str) -> str:
+    return ' '.join(stem(word) for word in WORD.findall(text))
+
+
+def match_expression(query: str) -> Optional[str]:
+    terms = normalize(query).split()[:settings.SEARCH_MAX_TERMS]
+    if not terms:
+        return None
+    return ' AND '.join(f'"{term}"*' for term in terms)
+
+
+def available() -> bool:
+    return connection.vendor == 'sqlite'
+
+
+def create_tables(cursor) -> None:
+    cursor.execute(
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {POST_TABLE} '
+        f'USING fts5(body, {TOKENIZER})',
+    )
+    cursor.execute(
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {COMMENT_TABLE} '
+        f'USING fts5(body, post_id UNINDEXED, {TOKENIZER})',
+    )
+
+
+def drop_tables(cursor) -> None:
+    cursor.execute(f'DROP TABLE IF EXISTS {POST_TABLE}')
+    cursor.execute(f'DROP TABLE IF EXISTS {COMMENT_TABLE}')
+
+
+def insert_posts(cursor, rows: Iterable[Tuple[int, str]]) -> None:
+    """Вставляет уже нормализованные тексты постов."""
+    cursor.executemany(
+        f'INSERT INTO {POST_TABLE} (rowid, body) VALUES (%s, %s)',
+        rows,
+    )
+
+
+def insert_comments(cursor, rows: Iterable[Tuple[int, int, str]]) -> None:
+    cursor.executemany(
+        f'INSERT INTO {COMMENT_TABLE} (rowid, post_id, body) '
+        'VALUES (%s, %s, %s)',
+        rows,
+    )
+
+
+def index_posts(cursor, posts: Iterable[Tuple[int, str]]) -> None:
+    posts = [(pk, normalize(text)) for pk, text in posts]
+    cursor.executemany(
+        f'DELETE FROM {POST_TABLE} WHERE rowid = %s',
+        [(pk,) for pk, _ in posts],
+    )
+    insert_posts(cursor, posts)
+
+
+def index_comments(cursor, comments: Iterable[Tuple[int, int, str]]) -> None:
+    comments = [
+        (pk, post_id, normalize(text)) for pk, post_id, text in comments
+    ]
+    cursor.executemany(
+        f'DELETE FROM {COMMENT_TABLE} WHERE rowid = %s',
+        [(pk,) for pk, _, _ in comments],
+    )
+    insert_comments(cursor, comments)
+
+
+def rebuild() -> None:
+    """Пересоздаёт индекс поиска по всем постам и комментариям.
+
+    Миграция создаёт только пустые таблицы: стеммер живёт в коде и
+    меняется вместе с ним, поэтому заполняет индекс эта функция
+    (команда ``rebuild_search_index``).
+    """
+    if not available():
+        return
+    with connection.cursor() as cursor:
+        drop_tables(cursor)
+        create_tables(cursor)
+        index_posts(
+            cursor,
+            Post.objects.values_list('pk', 'text').iterator(
+                settings.SEARCH_REBUILD_BATCH_SIZE,
+            ),
+        )
+        index_comments(
+            cursor,
+            Comment.objects.values_list('pk', 'post_id', 'text').iterator(
+                settings.SEARCH_REBUILD_BATCH_SIZE,
+            ),
+        )
+
+
+def index_post(post: Post) -> None:
+    if available():
+        with connection.cursor() as cursor:
+            index_posts(cursor, [(post.pk, post.text)])
+
+
+def index_comment(comment: Comment) -> None:
+    if available():
+        with connection.cursor() as cursor:
+            index_comments(
+                cursor,
+                [(comment.pk, comment.post_id, comment.text)],
+            )
+
+
+def unindex(table: str, pk: int) -> None:
+    if available():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {table} WHERE rowid = %s', [pk])
+
+
+class SearchResults:
+    """Найденные посты в порядке релевантности (bm25).
+
+    Совпадения в комментариях ранжируются ниже совпадений в тексте
+    поста; каждая таблица отдаёт не больше SEARCH_MAX_RESULTS лучших
+    строк, поэтому запрос не зависит от размера индекса.
+    """
+
+    def __init__(self, query: str) -> None:
+        self.query = query.strip()
+        self.match = match_expression(query)
+
+    @property
+    def matches(self) -> Tuple[str, List[Any]]:
+        limit = settings.SEARCH_MAX_RESULTS
+        return (
+            'SELECT post_id, MIN(score) AS score FROM ('
+            f'SELECT * FROM (SELECT rowid AS post_id, rank AS score '
+            f'FROM {POST_TABLE} WHERE {POST_TABLE} MATCH %s '
+            'ORDER BY rank LIMIT %s) '
+            'UNION ALL '
+            f'SELECT * FROM (SELECT post_id, rank * %s AS score '
+            f'FROM {COMMENT_TABLE} WHERE {COMMENT_TABLE} MATCH %s '
+            'ORDER BY rank LIMIT %s)'
+            ') GROUP BY post_id'
+        ), [
+            self.match,
+            limit,
+            settings.SEARCH_COMMENT_WEIGHT,
+            self.match,
+            limit,
+        ]
+
+    @cached_property
+    def _count(self) -> int:
+        if not self.match:
+            return 0
+        if not available():
+            return Post.objects.filter(text__icontains=self.query).count()
+        sql, params = self.matches
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM ({sql})', params)
+            return cursor.fetchone()[0]
+
+    def count(self) -> int:
+        return self._count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, item: slice) -> List[Post]:
+        posts = Post.objects.select_related('author', 'group')
+        if not self.match:
+            return []
+        if not available():
+            return list(posts.filter(text__icontains=self.query)[item])
+        sql, params = self.matches
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'{sql} ORDER BY score, post_id DESC LIMIT %s OFFSET %s',
+                params + [item.stop - item.start, item.start],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        found: Dict[int, Post] = posts.in_bulk(ids)
+        return [found[pk] for pk in ids if pk in found]
+
+
+class SearchPage(Page):
+    previous_cursor = None
+    next_cursor = None
+
+    @cached_property
+    def elided_page_range(self) -> List[Any]:
+        return list(self.paginator.get_elided_page_range(self.number))
+
+
+class SearchPaginator(Paginator):
+    def _get_page(self, *args: Any, **kwargs: Any) -> SearchPage:
+        return SearchPage(*args, **kwargs)
+
+
+def search(query: str, page: Optional[str]) -> SearchPage:
+    return SearchPaginator(
+        SearchResults(query),
+        settings.OBJECTS_PER_PAGE,
+    ).get_page(page)
@@ -0,0 +1,379 @@
+import random
+from array import array
+from bisect import bisect
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from io import BytesIO
+from itertools import accumulate
+from multiprocessing import Pool
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+
+from posts import counters, search, timeline
+from posts.models import Comment, Follow, Group, Post, User
+
+FOLLOW_ALPHA = 1.5
+AUTHOR_ALPHA = 1.1
+VOCABULARY_SIZE = 3000
+
+_context: Dict[str, Any] = {}
+
+
+def zipf_weights(size: int, alpha: float) -> array:
+    """Накопленные веса степенного распределения для ``bisect``."""
+    return array(
+        'd',
+        accumulate(1 / rank**alpha for rank in range(1, size + 1)),
+    )
+
+
+def pick(rng: random.Random, weights: array) -> int:
+    return bisect(weights, rng.random() * weights[-1])
+
+
+def _init(context: Dict[str, Any]) -> None:
+    _context.update(context)
+    _context['authors'] = zipf_weights(context['users'], AUTHOR_ALPHA)
+
+
+def _text(rng: random.Random, low: int, high: int) -> Tuple[str, str]:
+    words = rng.choices(_context['vocabulary'], k=rng.randint(low, high))
+    return (
+        ' '.join(words).capitalize() + '.',
+        ' '.join(_context['stems'][word] for word in words),
+    )
+
+
+def _post_date(pk: int) -> datetime:
+    return _context['start'] + _context['step'] * (pk - _context['first_post'])
+
+
+def _user_id(rng: random.Random) -> int:
+    return _context['first_user'] + pick(rng, _context['authors'])
+
+
+def _posts(task: Tuple[int, int, int]) -> List[Tuple]:
+    first, count, seed = task
+    rng = random.Random(seed)
+    rows = []
+    for pk in range(first, first + count):
+        text, body = _text(rng, 10, 60)
+        image = (
+            rng.choice(_context['images'])
+            if rng.random() < _context['image_ratio']
+            else ('', None, None)
+        )
+        rows.append(
+            (
+                pk,
+                _user_id(rng),
+                rng.choice(_context['groups']),
+                text,
+                _post_date(pk),
+                *image,
+                body,
+            ),
+        )
+    return rows
+
+
+def _comments(task: Tuple[int, int, int]) -> List[Tuple]:
+    first, count, seed = task
+    rng = random.Random(seed)
+    rows = []
+    for pk in range(first, first + count):
+        post_id = rng.randint(_context['first_post'], _context['last_post'])
+        text, body = _text(rng, 3, 20)
+        rows.append(
+            (
+                pk,
+                post_id,
+                _user_id(rng),
+                text,
+                _post_date(post_id) + timedelta(minutes=rng.randint(1, 600)),
+                body,
+            ),
+        )
+    return rows
+
+
+def _follows(task: Tuple[int, int, int]) -> List[Tuple[int, int]]:
+    first, count, seed = task
+    rng = random.Random(seed)
+    weights = zipf_weights(_context['users'], FOLLOW_ALPHA)
+    rows = []
+    for user_id in range(first, first + count):
+        wanted = min(
+            int(rng.paretovariate(FOLLOW_ALPHA) * _context['follows'] / 3),
+            _context['users'] - 1,
+        )
+        authors = set()
+        while len(authors) < wanted:
+            author_id = _context['first_user'] + pick(rng, weights)
+            if author_id != user_id:
+                authors.add(author_id)
+        rows.extend((user_id, author_id) for author_id in authors)
+    return rows
+
+
+def _tasks(first: int, total: int, batch: int, seed: int) -> Iterator:
+    for offset in range(0, total, batch):
+        yield first + offset, min(batch, total - offset), seed + offset
+
+
+@contextmanager
+def explicit_dates() -> Iterator[None]:
+    """Позволяет задать даты, которые обычно ставит ``auto_now_add``."""
+    fields = [
+        Post._meta.get_field('pub_date'),
+        Comment._meta.get_field('created'),
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def make_images(count: int, seed: int) -> List[Tuple[str, int, int]]:
+    """Готовит несколько картинок, общих для всех постов.
+
+    Хранилище адресует файлы по содержимому, поэтому повторный запуск
+    не плодит копии.
+    """
+    rng = random.Random(seed)
+    storage = Post._meta.get_field('image').storage
+    images = []
+    for _ in range(count):
+        size = (rng.randint(400, 1600), rng.randint(300, 1200))
+        image = Image.new('RGB', size, tuple(rng.choices(range(256), k=3)))
+        file = BytesIO()
+        image.save(file, 'JPEG', quality=85)
+        name = storage.save('posts/seed.jpg', ContentFile(file.getvalue()))
+        images.append((name, *size))
+    return images
+
+
+def _next_pk(model) -> int:
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+class Seeder:
+    """Быстро заполняет базу для нагрузочных замеров.
+
+    Строки генерируют процессы-воркеры, главный процесс только пишет их
+    в базу через ``bulk_create`` пачками. Первичные ключи назначаются
+    заранее, чтобы воркеры могли ссылаться на ещё не записанные строки.
+    Сигналы при этом не срабатывают, поэтому счётчики, ленты и поисковый
+    индекс пересчитываются в конце одним проходом.
+    """
+
+    def __init__(
+        self,
+        users: int,
+        groups: int,
+        posts: int,
+        comments: int,
+        follows: int,
+        images: int = 20,
+        image_ratio: float = 0.3,
+        days: int = 365,
+        batch_size: int = 10000,
+        workers: int = 0,
+        seed: int = 0,
+        log=None,
+    ) -> None:
+        self.users = users
+        self.groups = groups
+        self.posts = posts
+        self.comments = comments
+        self.follows = follows
+        self.images = images
+        self.image_ratio = image_ratio
+        self.days = days
+        self.batch_size = batch_size
+        self.workers = workers
+        self.seed = seed
+        self.log = log or (lambda message: None)
+
+    def context(self) -> Dict[str, Any]:
+        fake = Faker('ru_RU')
+        fake.seed_instance(self.seed)
+        vocabulary = sorted(
+            {
+                word.lower()
+                for word in fake.words(VOCABULARY_SIZE)
+                if search.WORD.fullmatch(word)
+            },
+        )
+        first_post = _next_pk(Post)
+        return {
+            'users': self.users,
+            'first_user': _next_pk(User),
+            'first_post': first_post,
+            'last_post': first_post + self.posts - 1,
+            'follows': self.follows,
+            'image_ratio': self.image_ratio,
+            'start': timezone.now() - timedelta(days=self.days),
+            'step': timedelta(days=self.days) / max(self.posts, 1),
+            'vocabulary': vocabulary,
+            'stems': {word: search.stem(word) for word in vocabulary},
+        }
+
+    def _generate(self, pool: Optional[Pool], func, first: int, total: int):
+        tasks = _tasks(first, total, self.batch_size, self.seed)
+        if pool is None:
+            return map(func, tasks)
+        return pool.imap(func, tasks)
+
+    def run(self) -> None:
+        context = self.context()
+        self.create_users(context)
+        context['groups'] = self.create_groups()
+        context['images'] = make_images(self.images, self.seed)
+        connections.close_all()
+        pool = Pool(self.workers, _init, (context,)) if self.workers else None
+        if pool is None:
+            _init(context)
+        try:
+            with explicit_dates():
+                self.create_posts(pool, context)
+                self.create_comments(pool, context)
+            self.create_follows(pool, context)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        self.finish()
+
+    def create_users(self, context: Dict[str, Any]) -> None:
+        password = make_password(None)
+        first = context['first_user']
+        for offset in range(0, self.users, self.batch_size):
+            User.objects.bulk_create(
+                User(
+                    pk=pk,
+                    username=f'seed{pk}',
+                    first_name=f'Автор {pk}',
+                    password=password,
+                )
+                for pk in range(
+                    first + offset,
+                    first + min(offset + self.batch_size, self.users),
+                )
+            )
+        self.log(f'Пользователей: {self.users}')
+
+    def create_groups(self) -> List[Optional[int]]:
+        first = _next_pk(Group)
+        Group.objects.bulk_create(
+            Group(
+                pk=pk,
+                title=f'Сообщество {pk}',
+                slug=f'seed-{pk}',
+                description=f'Сообщество номер {pk}',
+            )
+            for pk in range(first, first + self.groups)
+        )
+        self.log(f'Сообществ: {self.groups}')
+        return list(range(first, first + self.groups)) + [None]
+
+    def create_posts(self, pool: Optional[Pool], context: Dict) -> None:
+        rows = self._generate(pool, _posts, context['first_post'], self.posts)
+        for batch in rows:
+            with transaction.atomic():
+                Post.objects.bulk_create(
+                    Post(
+                        pk=pk,
+                        author_id=author_id,
+                        group_id=group_id,
+                        text=text,
+                        pub_date=pub_date,
+                        image=image,
+                        image_width=width,
+                        image_height=height,
+                    )
+                    for (
+                        pk,
+                        author_id,
+                        group_id,
+                        text,
+                        pub_date,
+                        image,
+                        width,
+                        height,
+                        _,
+                    ) in batch
+                )
+                if search.available():
+                    with connection.cursor() as cursor:
+                        search.insert_posts(
+                            cursor,
+                            [(row[0], row[-1]) for row in batch],
+                        )
+            self.log(f'Постов: {batch[-1][0] - context["first_post"] + 1}')
+
+    def create_comments(self, pool: Optional[Pool], context: Dict) -> None:
+        rows = self._generate(
+            pool, _comments, _next_pk(Comment), self.comments
+        )
+        for batch in rows:
+            with transaction.atomic():
+                Comment.objects.bulk_create(
+                    Comment(
+                        pk=pk,
+                        post_id=post_id,
+                        author_id=author_id,
+                        text=text,
+                        created=created,
+                    )
+                    for pk, post_id, author_id, text, created, _ in batch
+                )
+                if search.available():
+                    with connection.cursor() as cursor:
+                        search.insert_comments(
+                            cursor,
+                            [(row[0], row[1], row[-1]) for row in batch],
+                        )
+        self.log(f'Комментариев: {self.comments}')
+
+    def create_follows(self, pool: Optional[Pool], context: Dict) -> None:
+        total = 0
+        rows = self._generate(
+            pool, _follows, context['first_user'], self.users
+        )
+        for batch in rows:
+            Follow.objects.bulk_create(
+                (
+                    Follow(user_id=user_id, author_id=author_id)
+                    for user_id, author_id in batch
+                ),
+                batch_size=self.batch_size,
+                ignore_conflicts=True,
+            )
+            total += len(batch)
+        self.log(f'Подписок: {total}')
+
+    def finish(self) -> None:
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                no_style(),
+                [User, Group, Post, Comment],
+            ):
+                cursor.execute(sql)
+        with transaction.atomic():
+            counters.recount()
+        self.log('Счётчики пересчитаны')
+        with transaction.atomic():
+            timeline.rebuild()
+        self.log('Ленты заполнены')
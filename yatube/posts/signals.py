@@ -0,0 +1,127 @@
+from typing import Optional
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core import storage
+from core.cache import bump_generation
+from posts import counters, follow_graph, live, search, timeline
+from posts.models import Comment, Follow, Group, Post, Profile, User
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance: User, created: bool, **kwargs) -> None:
+    if created:
+        Profile.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance: Group, **kwargs) -> None:
+    bump_generation('posts')
+
+
+def release_image(name: str) -> None:
+    transaction.on_commit(lambda: storage.release(Post, 'image', name))
+
+
+def touch_groups(*groups: Optional[int]) -> None:
+    """Поднимает версии групп, в ленте которых изменился пост."""
+    counters.touch(Group.objects.filter(pk__in=set(groups) - {None}))
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance: Post, **kwargs) -> None:
+    instance.previous_image, instance.previous_group = (
+        Post.objects.filter(pk=instance.pk)
+        .values_list('image', 'group_id')
+        .first()
+        if instance.pk
+        else (None, None)
+    )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance: Post, created: bool, **kwargs) -> None:
+    bump_generation('posts')
+    search.index_post(instance)
+    if not created:
+        if instance.previous_image != instance.image.name:
+            release_image(instance.previous_image)
+        touch_groups(instance.group_id, instance.previous_group)
+        counters.touch(Profile.objects.filter(user_id=instance.author_id))
+        return
+    touch_groups(instance.group_id)
+    counters.bump(
+        Profile.objects.filter(user_id=instance.author_id),
+        'posts_count',
+    )
+    timeline.fan_out(instance)
+    transaction.on_commit(lambda: live.publish(instance))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance: Post, **kwargs) -> None:
+    bump_generation('posts')
+    release_image(instance.image.name)
+    search.unindex(search.POST_TABLE, instance.pk)
+    touch_groups(instance.group_id)
+    counters.bump(
+        Profile.objects.filter(user_id=instance.author_id),
+        'posts_count',
+        -1,
+    )
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance: Comment, created: bool, **kwargs) -> None:
+    search.index_comment(instance)
+    if created:
+        counters.bump(
+            Post.objects.filter(pk=instance.post_id),
+            'comments_count',
+        )
+    else:
+        counters.touch(Post.objects.filter(pk=instance.post_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance: Comment, **kwargs) -> None:
+    search.unindex(search.COMMENT_TABLE, instance.pk)
+    counters.bump(
+        Post.objects.filter(pk=instance.post_id),
+        'comments_count',
+        -1,
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance: Follow, created: bool, **kwargs) -> None:
+    follow_graph.invalidate(instance.user_id)
+    if created:
+        counters.bump(
+            Profile.objects.filter(user_id=instance.author_id),
+            'followers_count',
+        )
+        counters.bump(
+            Profile.objects.filter(user_id=instance.user_id),
+            'following_count',
+        )
+        timeline.backfill(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance: Follow, **kwargs) -> None:
+    follow_graph.invalidate(instance.user_id)
+    counters.bump(
+        Profile.objects.filter(user_id=instance.author_id),
+        'followers_count',
+        -1,
+    )
+    counters.bump(
+        Profile.objects.filter(user_id=instance.user_id),
+        'following_count',
+        -1,
+    )
+    timeline.drop(instance)
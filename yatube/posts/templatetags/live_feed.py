@@ -0,0 +1,12 @@
+from django import template
+from django.http import HttpRequest
+
+from posts import live
+
+register = template.Library()
+
+
+@register.simple_tag
+def live_events_path(request: HttpRequest) -> str:
+    """Адрес потока SSE; под WSGI живых обновлений нет."""
+    return live.PATH if live.served_async(request) else ''
@@ -0,0 +1,14 @@
+from typing import Iterable, List, Tuple
+
+from django import template
+from django.utils.safestring import SafeString
+
+from posts.cards import render_cards
+from posts.models import Post
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts: Iterable[Post]) -> List[Tuple[Post, SafeString]]:
+    return render_cards(posts)
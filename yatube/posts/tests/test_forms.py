@@ -1,12 +1,19 @@
 import os
 import shutil
+from io import BytesIO, StringIO
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from mixer.backend.django import mixer
+from PIL import Image
+
+from core.storage import release
 
 from posts.models import Comment, Group, Post
 from posts.tests import common
@@ -63,9 +70,158 @@ class PostFormTests(TestCase):
         self.assertEqual(post.group, self.group)
         self.assertEqual(post.text, "Тестовый пост")
         self.assertTrue(
-            post.image.name.endswith("giffy.png"),
+            Post.image.field.storage.is_content_name(post.image.name),
         )
 
+    @override_settings(POST_IMAGE_MAX_SIZE=100)
+    def test_post_create_image_normalized(self) -> None:
+        """Картинка уменьшается, пережимается и теряет EXIF.
+
+        Картинка без прозрачности становится JPEG, с прозрачностью — PNG.
+        """
+        for mode, image_format in (("RGB", "JPEG"), ("RGBA", "PNG")):
+            with self.subTest(mode=mode):
+                file = BytesIO()
+                exif = Image.Exif()
+                exif[0x010F] = "Camera"
+                Image.new(mode, size=(400, 200), color=(0, 155, 0)).save(
+                    file,
+                    "png",
+                    exif=exif,
+                )
+                self.auth.post(
+                    reverse("posts:post_create"),
+                    {
+                        "text": f"Пост с картинкой {mode}",
+                        "image": SimpleUploadedFile(
+                            "photo.png",
+                            file.getvalue(),
+                            content_type="image/png",
+                        ),
+                    },
+                )
+                post = Post.objects.get(text=f"Пост с картинкой {mode}")
+                self.assertEqual(
+                    (post.image_width, post.image_height),
+                    (100, 50),
+                )
+                with Image.open(post.image.path) as image:
+                    self.assertEqual(image.format, image_format)
+                    self.assertEqual(image.size, (100, 50))
+                    self.assertFalse(image.getexif())
+                    self.assertNotIn("exif", image.info)
+
+    def test_post_create_rejects_truncated_image(self) -> None:
+        """Обрезанный JPEG даёт ошибку формы, а не исключение."""
+        file = BytesIO()
+        Image.effect_noise((400, 200), 64).convert("RGB").save(file, "jpeg")
+        response = self.auth.post(
+            reverse("posts:post_create"),
+            {
+                "text": "Тестовый пост",
+                "image": SimpleUploadedFile(
+                    "photo.jpg",
+                    file.getvalue()[:len(file.getvalue()) // 2],
+                    content_type="image/jpeg",
+                ),
+            },
+        )
+        self.assertFalse(Post.objects.exists())
+        self.assertFormError(
+            response,
+            "form",
+            "image",
+            "Не удалось прочитать картинку.",
+        )
+
+    def test_post_create_rejects_fake_image(self) -> None:
+        """Файл с чужой сигнатурой отбрасывается при чтении потока."""
+        response = self.auth.post(
+            reverse("posts:post_create"),
+            {
+                "text": "Тестовый пост",
+                "image": SimpleUploadedFile(
+                    "fake.png",
+                    b"<?php echo 1; ?>",
+                    content_type="image/png",
+                ),
+            },
+        )
+        self.assertFalse(Post.objects.exists())
+        self.assertFormError(
+            response,
+            "form",
+            "image",
+            "Файл не является картинкой.",
+        )
+
+    @override_settings(UPLOAD_IMAGE_MAX_SIZE=10)
+    def test_post_create_rejects_large_image(self) -> None:
+        """Слишком большая картинка не сохраняется."""
+        response = self.auth.post(
+            reverse("posts:post_create"),
+            {"text": "Тестовый пост", "image": common.image()},
+        )
+        self.assertFalse(Post.objects.exists())
+        self.assertFormError(
+            response,
+            "form",
+            "image",
+            "Картинка слишком большая.",
+        )
+
+    @override_settings(UPLOAD_REQUEST_MAX_SIZE=100)
+    def test_post_create_rejects_large_request(self) -> None:
+        """Слишком большой запрос даёт ошибку формы, а не исключение."""
+        response = self.auth.post(
+            reverse("posts:post_create"),
+            {"text": "Тестовый пост", "image": common.image()},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Post.objects.exists())
+        self.assertFormError(response, "form", None, "Слишком большой запрос.")
+
+    def test_post_images_deduplicated(self) -> None:
+        """Одинаковые картинки хранятся одним файлом."""
+        for text in ("Первый пост", "Второй пост"):
+            self.auth.post(
+                reverse("posts:post_create"),
+                {"text": text, "image": common.image(name=f"{text}.png")},
+            )
+        first, second = Post.objects.all()
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(
+            Post.image.field.storage.is_content_name(first.image.name),
+        )
+
+    def test_reused_image_leased(self) -> None:
+        """Повторно загруженный файл не удаляется, пока пост не сохранён."""
+        storage = Post.image.field.storage
+        post = mixer.blend(Post, image=storage.save("a.png", common.image()))
+        name = post.image.name
+        post.delete()
+        self.assertEqual(storage.save("b.png", common.image()), name)
+        release(Post, "image", name)
+        self.assertTrue(storage.exists(name))
+        with override_settings(MEDIA_RELEASE_GRACE_SECONDS=0):
+            release(Post, "image", name)
+        self.assertFalse(storage.exists(name))
+
+    def test_migrate_media(self) -> None:
+        """Команда переносит старые файлы под имена по содержимому."""
+        storage = Post.image.field.storage
+        names = [
+            FileSystemStorage.save(storage, "posts/old.png", common.image())
+            for _ in range(2)
+        ]
+        for name in names:
+            mixer.blend(Post, image=name)
+        call_command("migrate_media", stdout=StringIO())
+        new_names = set(Post.objects.values_list("image", flat=True))
+        self.assertEqual(len(new_names), 1)
+        self.assertTrue(storage.is_content_name(new_names.pop()))
+        self.assertFalse(any(storage.exists(name) for name in names))
+
     def test_post_create_ok(self) -> None:
         """Posts.Forms. Создание нового Post гостем."""
         self.anon.post(
@@ -1,10 +1,25 @@
+import shutil
+import tempfile
+from io import StringIO
 from unittest import TestCase
 
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F, Sum
+from django.test import TestCase, override_settings
 from mixer.backend.django import mixer
 
 from core import utils
-from posts.models import Group, Post, Comment, Follow
+from posts import follow_graph, search
+from posts.models import (
+    Comment,
+    Follow,
+    Group,
+    Post,
+    Profile,
+    TimelineEntry,
+    User,
+)
 
 
 class GroupTest(TestCase):
@@ -57,3 +72,144 @@ class FollowTest(TestCase):
             f"Подписался {self.follow.user} на {self.follow.author}",
             str(self.follow),
         )
+
+
+class CountersTest(TestCase):
+    def test_counters_follow_changes(self):
+        """Счётчики профиля и поста обновляются при изменениях."""
+        author, reader = mixer.cycle(2).blend(User)
+        post = mixer.blend(Post, author=author)
+        comment = mixer.blend(Comment, post=post)
+        Follow.objects.create(user=reader, author=author)
+        author.profile.refresh_from_db()
+        reader.profile.refresh_from_db()
+        post.refresh_from_db()
+        self.assertEqual(author.profile.posts_count, 1)
+        self.assertEqual(author.profile.followers_count, 1)
+        self.assertEqual(reader.profile.following_count, 1)
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        Follow.objects.get().delete()
+        post.refresh_from_db()
+        author.profile.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(author.profile.followers_count, 0)
+
+    def test_recount(self):
+        """Команда пересчёта восстанавливает сбитые счётчики."""
+        post = mixer.blend(Post)
+        mixer.cycle(3).blend(Comment, post=post)
+        Post.objects.update(comments_count=0)
+        Profile.objects.update(posts_count=0)
+        call_command("recount_counters", stdout=StringIO())
+        post.refresh_from_db()
+        post.author.profile.refresh_from_db()
+        self.assertEqual(post.comments_count, 3)
+        self.assertEqual(post.author.profile.posts_count, 1)
+
+
+class VersionTest(TestCase):
+    def test_versions_follow_changes(self):
+        """Правка, комментарий и новый пост поднимают версии и ключи."""
+        group, other = mixer.cycle(2).blend(Group)
+        post = mixer.blend(Post, group=group)
+        key = post.cache_key
+        versions = {
+            "post": post.version,
+            "group": Group.objects.get(pk=group.pk).version,
+            "other": other.version,
+            "profile": Profile.objects.get(user=post.author).version,
+        }
+        post.text = "Правка"
+        post.group = other
+        post.save()
+        self.assertEqual(post.version, versions["post"] + 1)
+        self.assertNotEqual(post.cache_key, key)
+        mixer.blend(Comment, post=post)
+        post.refresh_from_db()
+        self.assertEqual(post.version, versions["post"] + 2)
+        group.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(group.version, versions["group"] + 1)
+        self.assertEqual(other.version, versions["other"] + 1)
+        self.assertEqual(
+            Profile.objects.get(user=post.author).version,
+            versions["profile"] + 1,
+        )
+
+
+class FollowGraphTest(TestCase):
+    def test_following_cached_and_invalidated(self):
+        """Подписки читаются из кэша и сбрасываются подпиской и отпиской."""
+        reader, *authors = mixer.cycle(4).blend(User)
+        for author in authors[:2]:
+            Follow.objects.create(user=reader, author=author)
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                list(follow_graph.following_ids(reader)),
+                [authors[0].pk, authors[1].pk],
+            )
+        reader = User.objects.get(pk=reader.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(follow_graph.is_following(reader, authors[1].pk))
+            self.assertFalse(follow_graph.is_following(reader, authors[2].pk))
+        Follow.objects.filter(user=reader, author=authors[0]).delete()
+        Follow.objects.create(user=reader, author=authors[2])
+        reader = User.objects.get(pk=reader.pk)
+        self.assertEqual(
+            list(follow_graph.following_ids(reader)),
+            [authors[1].pk, authors[2].pk],
+        )
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SeedingTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_seed_yatube(self):
+        """Команда заполняет базу согласованными данными."""
+        call_command(
+            "seed_yatube",
+            users=30,
+            groups=3,
+            posts=200,
+            comments=100,
+            follows=5,
+            images=2,
+            batch_size=64,
+            workers=0,
+            stdout=StringIO(),
+        )
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertEqual(
+            Profile.objects.aggregate(total=Sum("posts_count"))["total"],
+            200,
+        )
+        self.assertTrue(Post.objects.exclude(image="").exists())
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertFalse(Follow.objects.filter(user=F("author")).exists())
+        post = Post.objects.create(author=User.objects.first(), text="Ёжик")
+        self.assertGreater(post.pk, 200)
+        self.assertEqual(list(search.search("ежик", None)), [post])
+
+
+class SearchIndexTest(TestCase):
+    def test_rebuild_search_index(self):
+        """Команда пересоздаёт индекс поиска по текущим данным."""
+        post = mixer.blend(Post, text="Ёжики в тумане")
+        mixer.blend(Comment, post=post, text="Красивые закаты")
+        with connection.cursor() as cursor:
+            search.drop_tables(cursor)
+            search.create_tables(cursor)
+        self.assertEqual(list(search.search("ежик", None)), [])
+        call_command("rebuild_search_index", stdout=StringIO())
+        self.assertEqual(list(search.search("ежик", None)), [post])
+        self.assertEqual(list(search.search("закат", None)), [post])
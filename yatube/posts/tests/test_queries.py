@@ -0,0 +1,279 @@
+import contextvars
+import os
+import sqlite3
+import tempfile
+from io import BytesIO, StringIO
+from typing import Optional
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, connection, connections
+from django.http import HttpResponse
+from django.test import (
+    Client,
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+)
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import resolve, reverse
+from mixer.backend.django import mixer
+
+from core import metrics, routers
+from core.cache import cache_anonymous_page
+from core.middleware import ReplicaMiddleware
+from posts import benchmark, follow_graph
+from posts.models import Comment, Follow, Group, Post, User
+from yatube.wsgi import application
+
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN из SQLite")
+class FeedQueryPlanTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user, cls.author = mixer.cycle(2).blend(User)
+        cls.group = mixer.blend(Group)
+        cls.post = mixer.blend(
+            Post,
+            author=cls.author,
+            group=cls.group,
+            image="",
+        )
+        mixer.cycle(3).blend(Comment, post=cls.post)
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+        cls.client_auth = Client()
+        cls.client_auth.force_login(cls.user)
+
+    def plans(self, url: str) -> list:
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            self.client_auth.get(url)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                if "ORDER BY" not in query["sql"]:
+                    continue
+                cursor.execute("EXPLAIN QUERY PLAN " + query["sql"])
+                plans.append(
+                    (
+                        query["sql"],
+                        " / ".join(row[-1] for row in cursor.fetchall()),
+                    ),
+                )
+        return plans
+
+    def test_feeds_use_indexes(self) -> None:
+        """Ленты читаются по индексу без сортировки во временном B-дереве."""
+        urls = (
+            reverse("posts:index"),
+            reverse("posts:group_list", args=(self.group.slug,)),
+            reverse("posts:profile", args=(self.author.username,)),
+            reverse("posts:post_detail", args=(self.post.pk,)),
+            reverse("posts:follow_index"),
+        )
+        for url in urls:
+            plans = self.plans(url)
+            self.assertTrue(plans, url)
+            for sql, plan in plans:
+                with self.subTest(url=url, sql=sql):
+                    self.assertNotIn("TEMP B-TREE", plan)
+                    self.assertIn("INDEX", plan)
+
+
+class BenchmarkTests(TestCase):
+    def test_seed_counters(self) -> None:
+        """Счётчики комментариев после заполнения совпадают с данными."""
+        benchmark.seed(users=3, groups=1, posts=5, comments=10, follows=2)
+        for post in Post.objects.all():
+            with self.subTest(post=post.pk):
+                self.assertEqual(post.comments_count, post.comments.count())
+
+    def test_query_budgets(self) -> None:
+        """Число запросов каждой ленты укладывается в бюджет."""
+        benchmark.seed(users=5, groups=2, posts=30, comments=20, follows=3)
+        results = benchmark.run(repeat=2)
+        self.assertEqual(set(results), set(settings.BENCHMARK_BUDGETS))
+        budgets = {
+            name: {"queries": budget["queries"]}
+            for name, budget in settings.BENCHMARK_BUDGETS.items()
+        }
+        self.assertEqual(benchmark.regressions(results, budgets), [])
+
+
+@skipUnless(connection.vendor == "sqlite", "PRAGMA есть только в SQLite")
+class SqlitePragmaTests(TestCase):
+    def test_pragmas_applied_on_connect(self) -> None:
+        """Настройки SQLITE_PRAGMAS применяются к соединению."""
+        with connection.cursor() as cursor:
+            for pragma in ("cache_size", "busy_timeout"):
+                cursor.execute(f"PRAGMA {pragma}")
+                with self.subTest(pragma=pragma):
+                    self.assertEqual(
+                        cursor.fetchone()[0],
+                        settings.SQLITE_PRAGMAS[pragma],
+                    )
+
+
+@override_settings(REPLICA_DATABASES=["replica"])
+class ReplicaRoutingTests(TestCase):
+    def route(self, path: str, method: str = "get", **cookies) -> str:
+        """Алиас чтения, который видит представление."""
+        seen = []
+
+        def view(request) -> HttpResponse:
+            middleware.process_view(request, view, (), {})
+            seen.append(routers.current.get())
+            return HttpResponse()
+
+        factory = RequestFactory()
+        for name, value in cookies.items():
+            factory.cookies[name] = value
+        request = getattr(factory, method)(path)
+        request.resolver_match = resolve(path)
+        middleware = ReplicaMiddleware(view)
+        self.response = middleware(request)
+        return seen[0]
+
+    def test_feeds_read_from_replica(self) -> None:
+        """Ленты читаются с реплики, остальные страницы с основной базы."""
+        self.assertEqual(self.route(reverse("posts:index")), "replica")
+        self.assertIsNone(self.route(reverse("posts:search")))
+        self.assertIsNone(routers.current.get())
+
+    def test_pinned_to_primary_after_write(self) -> None:
+        """После записи клиент на время читает с основной базы."""
+        path = reverse("posts:add_comment", kwargs={"pk": 1})
+        self.route(path, method="post")
+        self.assertIn(settings.REPLICA_PIN_COOKIE, self.response.cookies)
+        pinned = {settings.REPLICA_PIN_COOKIE: "1"}
+        self.assertIsNone(self.route(reverse("posts:index"), **pinned))
+
+    def test_lagging_replica_skipped(self) -> None:
+        """Реплика, отставшая больше допустимого, не используется."""
+        lag = settings.REPLICA_MAX_LAG_SECONDS + 1
+        with mock.patch.object(routers, "lag", return_value=lag):
+            self.assertIsNone(self.route(reverse("posts:index")))
+
+    def test_shared_caches_filled_from_primary(self) -> None:
+        """Страница для общего кэша и подписки читаются с основной базы."""
+        seen = []
+
+        @cache_anonymous_page("posts")
+        def view(request) -> HttpResponse:
+            seen.append(routers.current.get())
+            return HttpResponse()
+
+        request = RequestFactory().get("/")
+        request.user = AnonymousUser()
+        user = mixer.blend(User)
+        cache.clear()
+        token = routers.current.set("replica")
+        try:
+            with mock.patch.object(
+                routers,
+                "same_database",
+                return_value=False,
+            ), CaptureQueriesContext(connection) as queries:
+                view(request)
+                follow_graph.following_ids(user)
+            self.assertEqual(routers.current.get(), "replica")
+        finally:
+            routers.current.reset(token)
+        self.assertEqual(seen, [None])
+        self.assertEqual(len(queries), 1)
+
+    def test_write_switches_reads_to_primary(self) -> None:
+        """Запись внутри запроса возвращает чтение на основную базу."""
+        router = routers.ReplicaRouter()
+        token = routers.current.set("replica")
+        try:
+            self.assertEqual(router.db_for_write(Post), routers.PRIMARY)
+            self.assertIsNone(router.db_for_read(Post))
+            self.assertTrue(routers.wrote.get())
+        finally:
+            routers.current.reset(token)
+
+
+@override_settings(REPLICA_DATABASES=["replica"], REPLICA_SYNC_SECONDS=0)
+class ReplicaSyncTests(TransactionTestCase):
+    def route(self) -> Optional[str]:
+        """Алиас, который выбрал бы для чтения запрос к ленте."""
+
+        def pick() -> Optional[str]:
+            routers.use_replica()
+            return routers.current.get()
+
+        return contextvars.copy_context().run(pick)
+
+    def test_sync_replica(self) -> None:
+        """Реплика читается только после синхронизации с основной базой."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "replica.sqlite3")
+        with mock.patch.dict(connections["replica"].settings_dict, NAME=path):
+            self.assertIsNone(self.route())
+            call_command("sync_replica", "replica", stdout=StringIO())
+            self.assertLess(
+                routers.lag("replica"),
+                settings.REPLICA_MAX_LAG_SECONDS,
+            )
+            self.assertEqual(self.route(), "replica")
+        replica = sqlite3.connect(path)
+        try:
+            tables = replica.execute(
+                "SELECT name FROM sqlite_master WHERE name = ?",
+                [Post._meta.db_table],
+            ).fetchall()
+        finally:
+            replica.close()
+        self.assertTrue(tables)
+
+
+class ConnectionReuseTests(TestCase):
+    def setUp(self) -> None:
+        # Как и тестовый клиент, не даём Django закрыть соединение
+        # с тестовой базой посреди транзакции TestCase.
+        for signal in (request_started, request_finished):
+            signal.disconnect(close_old_connections)
+            self.addCleanup(signal.connect, close_old_connections)
+
+    def request(self) -> None:
+        environ = {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": reverse("posts:index"),
+            "SERVER_NAME": "testserver",
+            "SERVER_PORT": "80",
+            "wsgi.input": BytesIO(),
+            "wsgi.url_scheme": "http",
+        }
+        response = application(environ, lambda status, headers: None)
+        b"".join(response)
+        response.close()
+
+    def count(self, result: str) -> float:
+        return metrics.DB_CONNECTIONS.values.get(("default", result), 0)
+
+    def test_connection_reused_between_requests(self) -> None:
+        """Запросы через WSGI работают на одном соединении потока."""
+        self.request()
+        opened = connection.connection
+        reused = self.count("reused")
+        self.request()
+        self.assertIs(connection.connection, opened)
+        self.assertEqual(self.count("reused"), reused + 1)
+
+    def test_broken_connection_dropped(self) -> None:
+        """Неработающее соединение закрывается до начала запроса."""
+        connection.ensure_connection()
+        broken = self.count("broken")
+        with mock.patch.object(connection, "is_usable", return_value=False):
+            with mock.patch.object(connection, "close") as close:
+                self.request()
+        close.assert_called_once()
+        self.assertEqual(self.count("broken"), broken + 1)
@@ -1,6 +1,7 @@
 from http import HTTPStatus
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 from mixer.backend.django import mixer
@@ -47,6 +48,9 @@ class PostURLTests(TestCase):
             "missing": "core.views.page_not_found",
         }
 
+    def setUp(self) -> None:
+        cache.clear()
+
     def test_http_statuses(self) -> None:
         httpstatuses = (
             (self.urls.get("detail"), HTTPStatus.OK, self.anon),
@@ -1,17 +1,49 @@
+import asyncio
 import os
 import shutil
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
 from django.core.cache import cache
-from django.test import Client, TestCase, override_settings
-from django.urls import reverse
+from django.core.management import call_command
+from django.db import connection
+from django.http import Http404, HttpResponse
+from django.test import (
+    AsyncRequestFactory,
+    Client,
+    TestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.template.loader import render_to_string
+from django.urls import path, reverse
+from django.utils.crypto import get_random_string
 from mixer.backend.django import mixer
 
-from posts.models import Follow, Group, Post
+from core import executor, querylog
+from core.cache import get_generation
+from posts import async_views, live, views
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+from posts.tests import common
+from yatube import asgi
 
 User = get_user_model()
 
+
+def authors(request) -> HttpResponse:
+    """Авторы постов без select_related: по запросу на каждый пост."""
+    return HttpResponse(
+        ", ".join(post.author.username for post in Post.objects.all()),
+    )
+
+
+urlpatterns = [path("authors/", authors, name="authors")]
+
 NUMBER_OF_POSTS = 3
 NUMBER_OF_OBJECT_PAGINATOR = 13
 TEMP_MEDIA_ROOT = os.path.join(settings.MEDIA_ROOT, "temp")
@@ -63,6 +95,23 @@ class PostPagesTests(TestCase):
         )
         self.assertEqual(response.context.get("post"), post)
 
+    def test_post_detail_comments_queries(self) -> None:
+        """Комментарии post_detail грузятся постранично без N+1."""
+        post = mixer.blend(Post, group=self.group, image="")
+        comments = mixer.cycle(settings.COMMENTS_PER_PAGE + 5).blend(
+            Comment,
+            post=post,
+        )
+        cache.clear()
+        with self.assertNumQueries(3):
+            response = self.anon.get(
+                reverse("posts:post_detail", args=(post.pk,)),
+            )
+        page = response.context.get("page_obj")
+        self.assertEqual(len(page), settings.COMMENTS_PER_PAGE)
+        self.assertEqual(page[0], comments[-1])
+        self.assertContains(response, comments[-1].author.username)
+
     def test_profile_page_show_correct_context(self) -> None:
         """Шаблон profile сформирован с правильным контекстом."""
         post = mixer.blend(Post, group=self.group)
@@ -107,18 +156,75 @@ class PostPagesTests(TestCase):
                 self.assertEqual(obj[0].image, post.image)
 
     def test_cache_index(self) -> None:
-        """Проверка хранения и очищения кэша для index."""
+        """Кэш index отдаётся без запросов к БД и сбрасывается новым постом."""
         posts = self.anon.get(reverse("posts:index")).content
+        with self.assertNumQueries(0):
+            posts_old = self.anon.get(reverse("posts:index")).content
+        self.assertEqual(posts_old, posts)
         mixer.blend(
             Post,
             text="test_new_post",
             author=self.user,
         )
-        posts_old = self.anon.get(reverse("posts:index")).content
-        self.assertEqual(posts_old, posts)
-        cache.clear()
         posts_new = self.anon.get(reverse("posts:index")).content
         self.assertNotEqual(posts_old, posts_new)
+        self.assertIn("test_new_post", posts_new.decode())
+
+    def test_cache_generation_bumped_after_commit(self) -> None:
+        """Поколение кэша страниц поднимается ещё раз после фиксации."""
+        before = get_generation("posts")
+        with self.captureOnCommitCallbacks() as callbacks:
+            mixer.blend(Post, author=self.user)
+        written = get_generation("posts")
+        self.assertNotEqual(written, before)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_generation("posts"), written)
+
+    def test_post_card_cache(self) -> None:
+        """Карточки постов берутся из кэша и сбрасываются при правке."""
+        post = mixer.blend(Post, author=self.user_author, image="")
+        url = reverse("posts:profile", args=(self.user_author.username,))
+        cache.clear()
+        self.assertTemplateUsed(
+            self.auth.get(url),
+            "posts/includes/post.html",
+        )
+        self.assertTemplateNotUsed(
+            self.auth.get(url),
+            "posts/includes/post.html",
+        )
+        self.auth.post(
+            reverse("posts:post_edit", args=(post.pk,)),
+            {"text": "Изменённый текст"},
+        )
+        self.assertContains(self.auth.get(url), "Изменённый текст")
+
+    def test_thumbnail_generated_in_background(self) -> None:
+        """Пока миниатюра строится в фоне, шаблон отдаёт оригинал.
+
+        Ни карточка, ни страница с оригиналом не остаются в кэше, и после
+        построения миниатюры она видна без сброса кэша.
+        """
+        post = mixer.blend(Post, author=self.user, image=common.image())
+        urls = (
+            reverse("posts:index"),
+            reverse("posts:profile", args=(self.user.username,)),
+            reverse("posts:post_detail", args=(post.pk,)),
+        )
+        cache.clear()
+        with self.captureOnCommitCallbacks() as callbacks:
+            for url in urls:
+                response = self.anon.get(url)
+                self.assertContains(response, post.image.url)
+                self.assertFalse(response.has_header("ETag"))
+        self.assertTrue(callbacks)
+        with override_settings(THUMBNAIL_WORKERS=0):
+            for callback in callbacks:
+                callback()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertNotContains(self.anon.get(url), post.image.url)
 
     def test_follows(self) -> None:
         self.anon.post(
@@ -140,7 +246,89 @@ class PostPagesTests(TestCase):
         )
         self.assertFalse(Follow.objects.exists())
 
+    def test_follow_timeline_fan_out(self) -> None:
+        """Новый пост раскладывается в ленты подписчиков при записи."""
+        Follow.objects.create(user=self.user_author, author=self.user)
+        post = mixer.blend(Post, author=self.user)
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.user_author,
+                post=post,
+            ).exists(),
+        )
+        Follow.objects.get().delete()
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_follow_timeline_pull_for_popular_authors(self) -> None:
+        """Посты популярных авторов видны сразу и сохраняются в фоне."""
+        Follow.objects.create(user=self.user_author, author=self.user)
+        post = mixer.blend(Post, author=self.user)
+        self.assertFalse(TimelineEntry.objects.exists())
+        with override_settings(ASYNC_DB_WORKERS=0):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.auth.get(reverse("posts:follow_index"))
+        self.assertEqual(list(response.context["page_obj"]), [post])
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+        self.assertTrue(TimelineEntry.objects.filter(post=post).exists())
+        response = self.auth.get(reverse("posts:follow_index"))
+        self.assertEqual(list(response.context["page_obj"]), [post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_follow_timeline_pulled_posts_paginated(self) -> None:
+        """Подтянутые посты вливаются в страницы по дате."""
+        popular = mixer.blend(User)
+        Follow.objects.create(user=self.user_author, author=self.user)
+        Follow.objects.create(user=self.user_author, author=popular)
+        Follow.objects.create(user=self.user, author=popular)
+        posts = [
+            mixer.blend(Post, author=author)
+            for _ in range(settings.OBJECTS_PER_PAGE)
+            for author in (self.user, popular)
+        ]
+        url = reverse("posts:follow_index")
+        page = self.auth.get(url).context["page_obj"]
+        pages = [list(page)]
+        while page.has_next():
+            page = self.auth.get(
+                url,
+                {"after": page.next_cursor},
+            ).context["page_obj"]
+            pages.append(list(page))
+        self.assertEqual(len(pages), 2)
+        self.assertEqual(
+            list(
+                self.auth.get(
+                    url,
+                    {"before": page.previous_cursor},
+                ).context["page_obj"],
+            ),
+            pages[0],
+        )
+        self.assertEqual(sum(pages, []), posts[::-1])
+        self.assertFalse(
+            TimelineEntry.objects.filter(
+                user=self.user_author,
+                author=popular,
+            ).exists(),
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_follow_timeline_pull_joins_follows(self) -> None:
+        """Подписки для pull присоединяются в SQL, а не списком id."""
+        for author in mixer.cycle(3).blend(User):
+            Follow.objects.create(user=self.user_author, author=author)
+        with CaptureQueriesContext(connection) as queries:
+            self.auth.get(reverse("posts:follow_index"))
+        (sql,) = [
+            query["sql"]
+            for query in queries.captured_queries
+            if "followers_count" in query["sql"]
+        ]
+        self.assertNotRegex(sql, r"IN \(\d")
+
     def test_paginator(self) -> None:
+        """Номера страниц работают там, где включён подсчёт."""
         posts_per_page = settings.OBJECTS_PER_PAGE
 
         posts_on_second_page = (
@@ -152,10 +340,6 @@ class PostPagesTests(TestCase):
             group=self.group,
         )
         page_reverse = (
-            (
-                "posts:index",
-                None,
-            ),
             ("posts:group_list", (posts[0].group.slug,)),
             ("posts:profile", (posts[0].author.username,)),
         )
@@ -175,3 +359,586 @@ class PostPagesTests(TestCase):
                     len(response_second.context["page_obj"]),
                     posts_on_second_page,
                 )
+
+    def test_paginator_numbers_opt_in(self) -> None:
+        """Без подсчёта ?page не делает OFFSET и открывает первую."""
+        mixer.cycle(NUMBER_OF_OBJECT_PAGINATOR).blend(Post, author=self.user)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            page = self.anon.get(
+                reverse("posts:index"),
+                {"page": 2},
+            ).context["page_obj"]
+        self.assertEqual(page.number, 1)
+        self.assertIsNone(page.paginator.count)
+        self.assertFalse(
+            any("OFFSET" in query["sql"] for query in queries),
+        )
+
+    def test_paginator_cursor(self) -> None:
+        """Переход по курсорам возвращает соседние страницы без OFFSET."""
+        posts = mixer.cycle(NUMBER_OF_OBJECT_PAGINATOR).blend(
+            Post,
+            author=self.user,
+        )
+        url = reverse("posts:profile", args=(self.user.username,))
+        first = self.anon.get(url).context["page_obj"]
+        second = self.anon.get(
+            url, {"after": first.next_cursor},
+        ).context["page_obj"]
+        back = self.anon.get(
+            url, {"before": second.previous_cursor},
+        ).context["page_obj"]
+        self.assertEqual(second.number, 2)
+        self.assertFalse(second.has_next())
+        self.assertEqual(
+            set(first) | set(second),
+            set(posts),
+        )
+        self.assertEqual(list(back), list(first))
+        self.assertEqual(back.number, 1)
+
+    def test_paginator_invalid_cursor(self) -> None:
+        """Испорченный курсор открывает первую страницу."""
+        post = mixer.blend(Post, author=self.user)
+        response = self.anon.get(
+            reverse("posts:profile", args=(self.user.username,)),
+            {"after": "broken"},
+        )
+        self.assertEqual(list(response.context["page_obj"]), [post])
+
+    def search(self, query: str) -> list:
+        response = self.anon.get(reverse("posts:search"), {"q": query})
+        return list(response.context["page_obj"])
+
+    def test_search(self) -> None:
+        """Поиск находит посты по словоформам и началу слова."""
+        post = mixer.blend(Post, text="Ёжики бежали по тропинкам", image="")
+        mixer.blend(Post, text="Совсем другая история", image="")
+        self.assertEqual(self.search("ежик"), [post])
+        self.assertEqual(self.search("тропинка бежать"), [post])
+        self.assertEqual(self.search("троп"), [post])
+        self.assertEqual(self.search("кошки"), [])
+        post.delete()
+        self.assertEqual(self.search("ежик"), [])
+
+    def test_search_comments(self) -> None:
+        """Совпадение в комментарии находит пост, но ниже поста."""
+        commented = mixer.blend(Post, text="Просто запись", image="")
+        mixer.blend(Comment, post=commented, text="Красивые закаты")
+        post = mixer.blend(Post, text="Закат над морем", image="")
+        self.assertEqual(self.search("закаты"), [post, commented])
+
+    @override_settings(METRICS_SAMPLE_RATE=1)
+    def test_metrics(self) -> None:
+        """Замеры запроса попадают в Server-Timing и на страницу метрик."""
+        mixer.blend(Post, image="")
+        cache.clear()
+        response = self.anon.get(reverse("posts:index"))
+        self.assertRegex(
+            response["Server-Timing"],
+            r'db;dur=[\d.]+;desc="2 queries".*cache;desc="0 hit, 2 miss"',
+        )
+        metrics = self.anon.get(reverse("metrics")).content.decode()
+        self.assertIn(
+            'yatube_cache_requests_total{view="posts:index",result="miss"}',
+            metrics,
+        )
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"}',
+            metrics,
+        )
+
+    def test_query_log(self) -> None:
+        """Запросы к БД пишутся в журнал по отпечаткам и местам вызова."""
+        self.assertEqual(
+            querylog.fingerprint("SELECT * FROM t WHERE id IN (1, 2, 3)"),
+            querylog.fingerprint("SELECT * FROM t WHERE id IN (%s, %s)"),
+        )
+        post = mixer.blend(Post, image="")
+        mixer.cycle(3).blend(Comment, post=post)
+        with tempfile.NamedTemporaryFile() as log, override_settings(
+            METRICS_SAMPLE_RATE=1,
+            QUERY_LOG_FILE=log.name,
+            QUERY_LOG_REPEAT_THRESHOLD=2,
+        ):
+            for _ in range(2):
+                self.anon.get(reverse("posts:post_detail", args=(post.pk,)))
+            entries = list(querylog.read())
+            output = StringIO()
+            call_command("query_report", stdout=output)
+        self.assertTrue(entries)
+        self.assertTrue(
+            all(entry["view"] == "posts:post_detail" for entry in entries),
+        )
+        self.assertIn("posts/views.py", output.getvalue())
+        self.assertIn('SELECT "posts_comment"', output.getvalue())
+        self.assertNotIn("N+1", output.getvalue())
+
+    @override_settings(ROOT_URLCONF=__name__)
+    def test_query_log_n_plus_one(self) -> None:
+        """Повторяющийся в цикле запрос помечается в отчёте как N+1."""
+        mixer.cycle(3).blend(Post, image="")
+        with tempfile.NamedTemporaryFile() as log, override_settings(
+            METRICS_SAMPLE_RATE=1,
+            QUERY_LOG_FILE=log.name,
+            QUERY_LOG_REPEAT_THRESHOLD=3,
+        ):
+            self.anon.get("/authors/")
+            output = StringIO()
+            call_command("query_report", "--n-plus-one", stdout=output)
+        self.assertIn("N+1 ×1", output.getvalue())
+        self.assertIn("posts/tests/test_views.py", output.getvalue())
+        self.assertIn('FROM "auth_user"', output.getvalue())
+
+
+@override_settings(ASYNC_DB_WORKERS=0)
+class AsyncViewsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.author = mixer.cycle(2).blend(User)
+        cls.group = mixer.blend(Group)
+        cls.post = Post.objects.create(
+            author=cls.author,
+            group=cls.group,
+            text="Асинхронный пост",
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.factory = AsyncRequestFactory()
+
+    def setUp(self) -> None:
+        cache.clear()
+
+    def request(self, name: str, user=None, **kwargs):
+        request = self.factory.get(reverse(f"posts:{name}", kwargs=kwargs))
+        request.user = user or AnonymousUser()
+        return request
+
+    async def test_async_views(self) -> None:
+        """Асинхронные страницы показывают те же посты."""
+        pages = (
+            (async_views.index, "index", {}),
+            (
+                async_views.group_posts,
+                "group_list",
+                {"slug": self.group.slug},
+            ),
+            (
+                async_views.profile,
+                "profile",
+                {"username": self.author.username},
+            ),
+            (async_views.post_detail, "post_detail", {"pk": self.post.pk}),
+            (async_views.follow_index, "follow_index", {}),
+        )
+        for view, name, kwargs in pages:
+            with self.subTest(name=name):
+                response = await view(
+                    self.request(name, self.reader, **kwargs),
+                    **kwargs,
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertIn(self.post.text, response.content.decode())
+
+    async def test_async_views_conditional(self) -> None:
+        """Асинхронные страницы отдают те же валидаторы и отвечают 304."""
+        pages = (
+            (views.index, async_views.index, "index", {}),
+            (
+                views.group_posts,
+                async_views.group_posts,
+                "group_list",
+                {"slug": self.group.slug},
+            ),
+            (
+                views.profile,
+                async_views.profile,
+                "profile",
+                {"username": self.author.username},
+            ),
+            (
+                views.post_detail,
+                async_views.post_detail,
+                "post_detail",
+                {"pk": self.post.pk},
+            ),
+        )
+        for view, async_view, name, kwargs in pages:
+            with self.subTest(name=name):
+                expected = await executor.run(
+                    view,
+                    self.request(name, self.reader, **kwargs),
+                    **kwargs,
+                )
+                response = await async_view(
+                    self.request(name, self.reader, **kwargs),
+                    **kwargs,
+                )
+                for header in ("ETag", "Last-Modified"):
+                    self.assertEqual(response[header], expected[header])
+                request = self.request(name, self.reader, **kwargs)
+                request.META["HTTP_IF_NONE_MATCH"] = response["ETag"]
+                response = await async_view(request, **kwargs)
+                self.assertEqual(response.status_code, 304)
+
+    async def test_async_views_not_found(self) -> None:
+        """Несуществующие группа, автор и пост дают 404."""
+        pages = (
+            (async_views.group_posts, "group_list", {"slug": "missing"}),
+            (async_views.profile, "profile", {"username": "missing"}),
+            (async_views.post_detail, "post_detail", {"pk": 0}),
+        )
+        for view, name, kwargs in pages:
+            with self.subTest(name=name), self.assertRaises(Http404):
+                await view(self.request(name, **kwargs), **kwargs)
+
+    async def test_async_follow_index_requires_login(self) -> None:
+        """Лента подписок перенаправляет анонима на вход."""
+        response = await async_views.follow_index(
+            self.request("follow_index"),
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(
+            response["Location"].startswith(reverse("users:login")),
+        )
+
+    @override_settings(ASYNC_DB_WORKERS=2)
+    async def test_executor_runs_in_pool(self) -> None:
+        """Синхронный код выполняется в потоках пула."""
+        name = await executor.run(lambda: threading.current_thread().name)
+        self.assertTrue(name.startswith("yatube-db"))
+
+
+@override_settings(
+    ASYNC_DB_WORKERS=0,
+    LIVE_STREAM_SECONDS=0.2,
+    LIVE_HEARTBEAT_SECONDS=0.1,
+    LIVE_POLL_TIMEOUT=0.1,
+)
+class LiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.author = mixer.cycle(2).blend(User)
+        cls.group = mixer.blend(Group)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self) -> None:
+        self.last = live.BROKER.last
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post = Post.objects.create(
+                author=self.author,
+                group=self.group,
+                text="Живой пост",
+            )
+
+    def test_post_published_to_feeds(self) -> None:
+        """Новый пост попадает в общую ленту, группу и ленту автора."""
+        for channel in (
+            "index",
+            f"group:{self.group.pk}",
+            f"author:{self.author.pk}",
+        ):
+            with self.subTest(channel=channel):
+                self.assertEqual(
+                    live.BROKER.since(self.last, frozenset({channel})),
+                    [(live.BROKER.last, self.post.pk)],
+                )
+        self.assertEqual(
+            live.BROKER.since(self.last, frozenset({"group:0"})),
+            [],
+        )
+
+    async def test_events_stream(self) -> None:
+        """Поток SSE под ASGI отдаёт пропущенные посты с Last-Event-ID."""
+        requests = [{"type": "http.request", "body": b""}]
+        sent = []
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            await asyncio.Event().wait()
+
+        async def send(message):
+            sent.append(message)
+
+        await asgi.application(
+            {
+                "type": "http",
+                "method": "GET",
+                "path": live.PATH,
+                "query_string": f"feed=group&slug={self.group.slug}".encode(),
+                "headers": [(b"last-event-id", str(self.last).encode())],
+            },
+            receive,
+            send,
+        )
+        self.assertIn(
+            (b"content-type", b"text/event-stream"),
+            sent[0]["headers"],
+        )
+        content = b"".join(
+            message.get("body", b"") for message in sent[1:]
+        ).decode()
+        self.assertIn(f"id: {live.BROKER.last}\nevent: posts", content)
+        self.assertIn(self.post.text, content)
+        self.assertIn(live.PING.decode(), content)
+
+    def test_no_live_updates_under_wsgi(self) -> None:
+        """Под WSGI нет ни потока SSE, ни баннера живых обновлений."""
+        self.assertEqual(Client().get(live.PATH).status_code, 404)
+        content = Client().get(reverse("posts:index")).content.decode()
+        self.assertNotIn('id="live"', content)
+        content = render_to_string(
+            "posts/includes/live.html",
+            {"feed": "index"},
+            request=AsyncRequestFactory().get(reverse("posts:index")),
+        )
+        self.assertIn(f'data-events="{live.PATH}?feed=index"', content)
+        self.assertIn("data-poll=", content)
+
+    def test_long_poll(self) -> None:
+        """Длинный опрос отдаёт число новых постов и их карточки."""
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(
+            reverse("posts:live_poll"),
+            {"feed": "follow", "after": self.last},
+        )
+        data = response.json()
+        self.assertEqual(data["count"], 1)
+        self.assertEqual(data["last"], live.BROKER.last)
+        self.assertIn(self.post.text, data["cards"][0])
+        response = client.get(
+            reverse("posts:live_poll"),
+            {"feed": "follow", "after": data["last"]},
+        )
+        self.assertEqual(response.json()["count"], 0)
+
+    def test_follow_feed_requires_login(self) -> None:
+        """Ленту подписок нельзя слушать анонимно."""
+        response = Client().get(
+            reverse("posts:live_poll"),
+            {"feed": "follow"},
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.author = mixer.cycle(2).blend(User)
+        cls.group = mixer.blend(Group)
+        cls.posts = [
+            Post.objects.create(author=cls.author, group=cls.group, text=text)
+            for text in ("Первый", "Второй", "Третий")
+        ]
+        mixer.blend(Comment, post=cls.posts[0], author=cls.reader)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def test_posts(self) -> None:
+        """Лента отдаётся одним плоским запросом после отметки изменений."""
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("posts:api_posts"))
+        data = response.json()
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(
+            [post["text"] for post in data["results"]],
+            ["Третий", "Второй", "Первый"],
+        )
+        self.assertEqual(data["results"][0]["author"], self.author.username)
+        self.assertEqual(data["results"][0]["group"], self.group.slug)
+        self.assertIsNone(data["next"])
+
+    def test_not_modified(self) -> None:
+        """Совпавший If-None-Match даёт 304, новый пост меняет ETag."""
+        url = reverse("posts:api_group", args=(self.group.slug,))
+        etag = self.client.get(url)["ETag"]
+        with self.assertNumQueries(2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], etag)
+        Post.objects.create(author=self.author, group=self.group, text="Н")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_etag_changes(self) -> None:
+        """Комментарий, курсор страницы и подписка меняют ETag."""
+        post = self.posts[0]
+        url = reverse("posts:api_comments", args=(post.pk,))
+        etag = self.client.get(url)["ETag"]
+        mixer.blend(Comment, post=post, author=self.reader)
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            200,
+        )
+        url = reverse("posts:api_posts")
+        etag = self.client.get(url)["ETag"]
+        self.assertNotEqual(
+            self.client.get(url, {"after": "cursor"})["ETag"],
+            etag,
+        )
+        url = reverse("posts:api_follow")
+        self.client.force_login(self.reader)
+        etag = self.client.get(url)["ETag"]
+        Follow.objects.filter(user=self.reader).delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"], [])
+
+    def test_resources(self) -> None:
+        """Пост, комментарии, группы и профиль отдаются в JSON."""
+        post = self.posts[0]
+        self.assertEqual(
+            self.client.get(reverse("posts:api_post", args=(post.pk,)))
+            .json()["comments"],
+            1,
+        )
+        self.assertEqual(
+            self.client.get(reverse("posts:api_comments", args=(post.pk,)))
+            .json()["results"][0]["author"],
+            self.reader.username,
+        )
+        self.assertEqual(
+            self.client.get(reverse("posts:api_groups")).json()[0]["slug"],
+            self.group.slug,
+        )
+        profile = self.client.get(
+            reverse("posts:api_profile", args=(self.author.username,)),
+        ).json()
+        self.assertEqual(profile["posts_count"], 3)
+        self.assertEqual(profile["followers_count"], 1)
+        self.assertEqual(len(profile["posts"]["results"]), 3)
+        for url in (
+            reverse("posts:api_post", args=(0,)),
+            reverse("posts:api_comments", args=(0,)),
+            reverse("posts:api_group", args=("missing",)),
+            reverse("posts:api_profile", args=("missing",)),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_follow(self) -> None:
+        """Лента подписок требует входа и отдаёт посты авторов."""
+        url = reverse("posts:api_follow")
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(self.reader)
+        self.assertEqual(
+            [post["id"] for post in self.client.get(url).json()["results"]],
+            [post.pk for post in reversed(self.posts)],
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0, ASYNC_DB_WORKERS=0)
+    def test_follow_pull_values(self) -> None:
+        """Посты популярных авторов подтягиваются без создания моделей."""
+        cache.clear()
+        post = Post.objects.create(author=self.author, text="Четвёртый")
+        self.client.force_login(self.reader)
+        with mock.patch.object(Post, "from_db", side_effect=AssertionError):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.get(reverse("posts:api_follow"))
+        self.assertEqual(response.json()["results"][0]["id"], post.pk)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists(),
+        )
+
+
+class ConditionalPagesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.author = mixer.cycle(2).blend(User)
+        cls.group = mixer.blend(Group)
+        cls.post = Post.objects.create(
+            author=cls.author,
+            group=cls.group,
+            text="Пост",
+        )
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.auth = Client()
+        self.auth.force_login(self.reader)
+        self.auth.cookies[settings.CSRF_COOKIE_NAME] = get_random_string(32)
+
+    def test_not_modified(self) -> None:
+        """Повторный запрос с ETag получает 304 одним запросом к БД."""
+        for url in (
+            reverse("posts:index"),
+            reverse("posts:group_list", args=(self.group.slug,)),
+            reverse("posts:profile", args=(self.author.username,)),
+            reverse("posts:post_detail", args=(self.post.pk,)),
+        ):
+            with self.subTest(url=url):
+                response = self.auth.get(url)
+                self.assertTrue(response.has_header("Last-Modified"))
+                with self.assertNumQueries(3):
+                    response = self.auth.get(
+                        url,
+                        HTTP_IF_NONE_MATCH=response["ETag"],
+                    )
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b"")
+
+    def test_changes_etag(self) -> None:
+        """Правки, подписка, удаление и другой читатель меняют ETag."""
+        url = reverse("posts:post_detail", args=(self.post.pk,))
+        etag = self.auth.get(url)["ETag"]
+        self.assertNotEqual(self.client.get(url)["ETag"], etag)
+        Comment.objects.create(post=self.post, author=self.reader, text="К")
+        self.assertEqual(
+            self.auth.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            200,
+        )
+        url = reverse("posts:group_list", args=(self.group.slug,))
+        etag = self.auth.get(url)["ETag"]
+        self.post.text = "Правка"
+        self.post.save()
+        self.assertEqual(
+            self.auth.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            200,
+        )
+        url = reverse("posts:profile", args=(self.author.username,))
+        etag = self.auth.get(url)["ETag"]
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(
+            self.auth.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            200,
+        )
+        url = reverse("posts:index")
+        etag = self.auth.get(url)["ETag"]
+        self.post.delete()
+        self.assertEqual(
+            self.auth.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            200,
+        )
+
+    def test_post_detail_etag(self) -> None:
+        """ETag поста меняется с именем автора и CSRF-секретом читателя."""
+        url = reverse("posts:post_detail", args=(self.post.pk,))
+        etag = self.auth.get(url)["ETag"]
+        self.assertEqual(
+            self.auth.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            304,
+        )
+        self.author.first_name = "Новое имя"
+        self.author.save()
+        response = self.auth.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.auth.cookies[settings.CSRF_COOKIE_NAME] = get_random_string(32)
+        self.assertEqual(
+            self.auth.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            200,
+        )
+
+    def test_cached_page_not_modified(self) -> None:
+        """Страница из кэша для гостей отвечает 304 без запросов к БД."""
+        url = reverse("posts:index")
+        response = self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                url,
+                HTTP_IF_MODIFIED_SINCE=response["Last-Modified"],
+            )
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,198 @@
+from typing import Any, Dict, Iterable, List, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import QuerySet
+from django.db.models.expressions import RawSQL
+
+from core import executor
+from posts import follow_graph
+from posts.models import Follow, Post, Profile, TimelineEntry, User
+
+KEYS = ('pub_date', 'post_id')
+
+
+def _entry(user_id: int, post: Post) -> TimelineEntry:
+    return TimelineEntry(
+        user_id=user_id,
+        post_id=post.pk,
+        author_id=post.author_id,
+        pub_date=post.pub_date,
+    )
+
+
+def _save(entries: Iterable[TimelineEntry]) -> None:
+    TimelineEntry.objects.bulk_create(
+        entries,
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out(post: Post) -> None:
+    """Раскладывает новый пост по лентам подписчиков автора.
+
+    Авторов, у которых подписчиков больше TIMELINE_FANOUT_LIMIT, не
+    раскладываем: их посты подтягиваются в ленту при чтении (pull).
+    """
+    followers = list(
+        Follow.objects.filter(author_id=post.author_id).values_list(
+            'user_id',
+            flat=True,
+        )[:settings.TIMELINE_FANOUT_LIMIT + 1],
+    )
+    if len(followers) > settings.TIMELINE_FANOUT_LIMIT:
+        return
+    _save(_entry(user_id, post) for user_id in followers)
+
+
+def backfill(follow: Follow) -> None:
+    _save(
+        _entry(follow.user_id, post)
+        for post in Post.objects.filter(author_id=follow.author_id).only(
+            'pk',
+            'author_id',
+            'pub_date',
+        )[:settings.TIMELINE_BACKFILL]
+    )
+
+
+def drop(follow: Follow) -> None:
+    TimelineEntry.objects.filter(
+        user_id=follow.user_id,
+        author_id=follow.author_id,
+    ).delete()
+
+
+def rebuild() -> None:
+    """Заполняет ленты так, как их заполнил бы ``backfill``.
+
+    Нужен после массовой загрузки данных в обход сигналов: каждому
+    подписчику достаются последние TIMELINE_BACKFILL постов автора.
+    Считает, что счётчики подписчиков в профилях уже пересчитаны.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {TimelineEntry._meta.db_table} '
+            '(user_id, post_id, author_id, pub_date) '
+            'SELECT follow.user_id, latest.id, latest.author_id, '
+            'latest.pub_date '
+            f'FROM {Follow._meta.db_table} follow '
+            f'JOIN {Profile._meta.db_table} profile '
+            'ON profile.user_id = follow.author_id '
+            'JOIN (SELECT id, author_id, pub_date, ROW_NUMBER() OVER '
+            '(PARTITION BY author_id ORDER BY pub_date DESC) AS position '
+            f'FROM {Post._meta.db_table}) latest '
+            'ON latest.author_id = follow.author_id '
+            'WHERE latest.position <= %s AND profile.followers_count <= %s '
+            'ON CONFLICT DO NOTHING',
+            [settings.TIMELINE_BACKFILL, settings.TIMELINE_FANOUT_LIMIT],
+        )
+
+
+def missing(user: User) -> QuerySet:
+    """Свежие посты авторов без fan-out, которых ещё нет в ленте.
+
+    Один запрос на всех популярных авторов из подписок: подписки и
+    профили присоединяются в SQL, из последних TIMELINE_BACKFILL постов
+    каждого автора (по индексу автора и даты) берутся те, что новее
+    последнего уже подтянутого. Без подписок в ``follow_graph`` запросов
+    нет вовсе.
+    """
+    if not follow_graph.following_ids(user):
+        return Post.objects.none()
+    return Post.objects.filter(
+        pk__in=RawSQL(
+            'SELECT post.id '
+            f'FROM {Follow._meta.db_table} follow '
+            f'JOIN {Profile._meta.db_table} profile '
+            'ON profile.user_id = follow.author_id '
+            f'JOIN {Post._meta.db_table} post '
+            'ON post.author_id = follow.author_id '
+            'WHERE follow.user_id = %s '
+            'AND profile.followers_count > %s '
+            'AND post.id IN (SELECT latest.id '
+            f'FROM {Post._meta.db_table} latest '
+            'WHERE latest.author_id = follow.author_id '
+            'ORDER BY latest.pub_date DESC LIMIT %s) '
+            'AND NOT EXISTS (SELECT 1 '
+            f'FROM {TimelineEntry._meta.db_table} entry '
+            'WHERE entry.user_id = %s AND entry.author_id = post.author_id '
+            'AND entry.pub_date >= post.pub_date)',
+            (
+                user.pk,
+                settings.TIMELINE_FANOUT_LIMIT,
+                settings.TIMELINE_BACKFILL,
+                user.pk,
+            ),
+        ),
+    ).order_by()
+
+
+def _persist(entries: List[TimelineEntry]) -> None:
+    if entries:
+        transaction.on_commit(lambda: executor.submit(_save, entries))
+
+
+def pull(user: User) -> List[TimelineEntry]:
+    """Подтягивает в ленту свежие посты авторов без fan-out.
+
+    Записи возвращаются сразу и вливаются в страницу, которая строится
+    сейчас (``feed``), а сохраняются в фоновом пуле ``core.executor``:
+    GET ленты ничего не пишет сам и не закрепляет читателя за основной
+    базой.
+    """
+    entries = []
+    for post in missing(user).select_related('author', 'group'):
+        entry = _entry(user.pk, post)
+        # Присваивание entry.post спросило бы у роутера базу для записи
+        # и закрепило бы читателя за основной.
+        TimelineEntry.post.field.set_cached_value(entry, post)
+        entries.append(entry)
+    _persist(entries)
+    return entries
+
+
+def pull_values(user: User, *fields: str) -> List[Dict[str, Any]]:
+    """``pull`` для JSON API: посты читаются через ``.values()``.
+
+    Возвращает строки с полями поста ``fields`` в том же виде, что и
+    ``.values()`` записей ленты (``pub_date``, ``post_id`` и
+    ``post__<поле>``), чтобы передать их в ``paginate`` как ``extra``.
+    """
+    rows = list(missing(user).values('pk', 'author_id', 'pub_date', *fields))
+    _persist(
+        [
+            TimelineEntry(
+                user_id=user.pk,
+                post_id=row['pk'],
+                author_id=row['author_id'],
+                pub_date=row['pub_date'],
+            )
+            for row in rows
+        ],
+    )
+    return [
+        {
+            'pub_date': row['pub_date'],
+            'post_id': row['pk'],
+            **{f'post__{field}': row[field] for field in fields},
+        }
+        for row in rows
+    ]
+
+
+def feed(user: User) -> Tuple[QuerySet, List[TimelineEntry]]:
+    """Записи ленты и подтянутые при чтении, ещё не сохранённые.
+
+    Вторые передаются в ``paginate`` как ``extra`` и вливаются в
+    страницу по ключам ``KEYS``.
+    """
+    pulled = pull(user)
+    return (
+        TimelineEntry.objects.filter(user=user).select_related(
+            'post__author',
+            'post__group',
+        ),
+        pulled,
+    )
@@ -1,19 +1,31 @@
+from django.conf import settings
 from django.urls import path
 
-from posts import views
+from posts import api, async_views, views
 from posts.apps import PostsConfig
 
 app_name = PostsConfig.name
 
+reads = async_views if settings.ASYNC_VIEWS else views
+
 urlpatterns = [
-    path('', views.index, name='index'),
+    path('', reads.index, name='index'),
     path('create/', views.post_create, name='post_create'),
-    path('follow/', views.follow_index, name='follow_index'),
-    path('group/<slug:slug>/', views.group_posts, name='group_list'),
-    path('posts/<int:pk>/', views.post_detail, name='post_detail'),
+    path('follow/', reads.follow_index, name='follow_index'),
+    path('search/', views.search_posts, name='search'),
+    path('live/poll/', async_views.live_poll, name='live_poll'),
+    path('group/<slug:slug>/', reads.group_posts, name='group_list'),
+    path('posts/<int:pk>/', reads.post_detail, name='post_detail'),
     path('posts/<int:pk>/edit/', views.post_edit, name='post_edit'),
     path('posts/<int:pk>/comment/', views.add_comment, name='add_comment'),
-    path('profile/<str:username>/', views.profile, name='profile'),
+    path('profile/<str:username>/', reads.profile, name='profile'),
+    path('api/posts/', api.posts, name='api_posts'),
+    path('api/posts/<int:pk>/', api.post, name='api_post'),
+    path('api/posts/<int:pk>/comments/', api.comments, name='api_comments'),
+    path('api/groups/', api.groups, name='api_groups'),
+    path('api/groups/<slug:slug>/', api.group, name='api_group'),
+    path('api/profiles/<str:username>/', api.profile, name='api_profile'),
+    path('api/follow/', api.follow, name='api_follow'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
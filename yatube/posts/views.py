@@ -1,13 +1,21 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.http import urlencode
 
 
+from core import thumbnails
+from core.cache import cache_anonymous_page, conditional_page
 from core.utils import paginate
+from posts import follow_graph, freshness, search, timeline
 from posts.forms import CommentForm, PostForm
 from posts.models import Follow, Group, Post, User
 
 
+@cache_anonymous_page('posts')
+@conditional_page(freshness.index)
 def index(request: HttpRequest) -> HttpResponse:
     return render(
         request,
@@ -24,6 +32,8 @@ def index(request: HttpRequest) -> HttpResponse:
     )
 
 
+@cache_anonymous_page('posts')
+@conditional_page(freshness.group)
 def group_posts(request: HttpRequest, slug: str) -> HttpResponse:
     group = get_object_or_404(Group, slug=slug)
     return render(
@@ -33,17 +43,31 @@ def group_posts(request: HttpRequest, slug: str) -> HttpResponse:
             'group': group,
             'page_obj': paginate(
                 request,
-                group.posts.select_related('group'),
+                group.posts.select_related('author', 'group'),
+                count=True,
             ),
         },
     )
 
 
+def search_posts(request: HttpRequest) -> HttpResponse:
+    query = request.GET.get('q', '')
+    return render(
+        request,
+        'posts/search.html',
+        {
+            'query': query,
+            'page_obj': search.search(query, request.GET.get('page')),
+            'page_query': urlencode({'q': query}) + '&',
+        },
+    )
+
+
+@conditional_page(freshness.profile)
 def profile(request: HttpRequest, username: str) -> HttpResponse:
-    author = get_object_or_404(User, username=username)
-    follows = (
-        request.user.is_authenticated
-        and Follow.objects.filter(user=request.user, author=author).exists()
+    author = get_object_or_404(
+        User.objects.select_related('profile'),
+        username=username,
     )
     return render(
         request,
@@ -52,35 +76,53 @@ def profile(request: HttpRequest, username: str) -> HttpResponse:
             'author': author,
             'page_obj': paginate(
                 request,
-                author.posts.select_related('author'),
+                author.posts.select_related('author', 'group'),
+                count=True,
+            ),
+            'following': follow_graph.is_following(
+                request.user,
+                author.pk,
             ),
-            'following': follows,
         },
     )
 
 
+@conditional_page(freshness.post_detail)
 def post_detail(request: HttpRequest, pk: int) -> HttpResponse:
-    post = get_object_or_404(Post, pk=pk)
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'),
+        pk=pk,
+    )
     return render(
         request,
         'posts/post_detail.html',
         {
             'post': post,
+            'body_timeout': settings.POST_CARD_CACHE_TIMEOUT,
             'form': CommentForm(request.POST or None),
+            'page_obj': paginate(
+                request,
+                post.comments.select_related('author'),
+                settings.COMMENTS_PER_PAGE,
+                keys=('created', 'pk'),
+            ),
         },
     )
 
 
 @login_required
+@transaction.atomic
 def post_create(request: HttpRequest) -> HttpResponse:
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
+        upload_errors=getattr(request, 'upload_errors', None),
     )
     if not form.is_valid():
         return render(request, 'posts/create_post.html', {'form': form})
     form.instance.author = request.user
-    form.save()
+    post = form.save()
+    thumbnails.pregenerate(post.image)
     return redirect('posts:profile', request.user)
 
 
@@ -93,9 +135,11 @@ def post_edit(request: HttpRequest, pk: int) -> HttpResponse:
         request.POST or None,
         files=request.FILES or None,
         instance=post,
+        upload_errors=getattr(request, 'upload_errors', None),
     )
     if form.is_valid():
         form.save()
+        thumbnails.pregenerate(post.image)
         return redirect('posts:post_detail', pk=post.pk)
     return render(
         request,
@@ -108,6 +152,7 @@ def post_edit(request: HttpRequest, pk: int) -> HttpResponse:
 
 
 @login_required
+@transaction.atomic
 def add_comment(request: HttpRequest, pk: int) -> HttpResponse:
     post = get_object_or_404(Post, pk=pk)
     form = CommentForm(request.POST or None)
@@ -120,19 +165,24 @@ def add_comment(request: HttpRequest, pk: int) -> HttpResponse:
 
 @login_required
 def follow_index(request: HttpRequest) -> HttpResponse:
+    entries, pulled = timeline.feed(request.user)
     return render(
         request,
         'posts/follow.html',
         {
             'page_obj': paginate(
                 request,
-                Post.objects.filter(author__following__user=request.user),
+                entries,
+                keys=timeline.KEYS,
+                transform=lambda entry: entry.post,
+                extra=pulled,
             ),
         },
     )
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request: HttpRequest, username: str) -> HttpResponse:
     author = get_object_or_404(User, username=username)
     if author != request.user:
@@ -141,6 +191,7 @@ def profile_follow(request: HttpRequest, username: str) -> HttpResponse:
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request: HttpRequest, username: str) -> HttpResponse:
     get_object_or_404(
         Follow,
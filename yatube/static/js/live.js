@@ -0,0 +1,59 @@
+(function () {
+    var banner = document.getElementById('live');
+    if (!banner) {
+        return;
+    }
+    var counter = banner.querySelector('span');
+    var count = 0;
+    var cards = [];
+
+    function receive(data) {
+        if (!data.count) {
+            return;
+        }
+        count += data.count;
+        cards = data.cards.concat(cards);
+        counter.textContent = count;
+        banner.hidden = false;
+    }
+
+    banner.querySelector('a').addEventListener('click', function (event) {
+        event.preventDefault();
+        banner.insertAdjacentHTML('afterend', cards.join('<hr>') + '<hr>');
+        count = 0;
+        cards = [];
+        banner.hidden = true;
+    });
+
+    if (window.EventSource) {
+        new EventSource(banner.dataset.events).addEventListener(
+            'posts',
+            function (event) {
+                receive(JSON.parse(event.data));
+            }
+        );
+        return;
+    }
+
+    var last = null;
+
+    function poll() {
+        var url = banner.dataset.poll + (last === null ? '' : '&after=' + last);
+        fetch(url, {credentials: 'same-origin'})
+            .then(function (response) {
+                return response.ok ? response.json() : Promise.reject(response);
+            })
+            .then(function (data) {
+                if (last !== null) {
+                    receive(data);
+                }
+                last = data.last;
+                poll();
+            })
+            .catch(function () {
+                setTimeout(poll, 5000);
+            });
+    }
+
+    poll();
+})();
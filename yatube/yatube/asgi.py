@@ -4,4 +4,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yatube.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from posts import live  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "http" and scope["path"] == live.PATH:
+        await live.application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -39,6 +39,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'debug_toolbar.middleware.DebugToolbarMiddleware',
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,7 +56,7 @@ TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.templating.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -71,13 +73,65 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+ASGI_APPLICATION = 'yatube.asgi.application'
+
+ASYNC_VIEWS = False
+
+ASYNC_DB_WORKERS = 8
+
+CONN_MAX_AGE = 60
+
+DB_HEALTH_CHECKS = True
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'TEST': {
+            'MIRROR': 'default',
+        },
     },
 }
 
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+REPLICA_DATABASES = [
+    alias
+    for alias in ('replica',)
+    if os.path.exists(DATABASES[alias]['NAME'])
+]
+
+REPLICA_VIEWS = (
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:follow_index',
+)
+
+REPLICA_STICKY_SECONDS = 10
+
+REPLICA_SYNC_SECONDS = 5
+
+REPLICA_MAX_LAG_SECONDS = 30
+
+REPLICA_PIN_COOKIE = 'primary'
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'cache_size': -64 * 1024,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'memory',
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -123,8 +177,94 @@ OBJECTS_PER_PAGE = 10
 
 NUMBER_CUTED_LETTERS = 15
 
-# CACHES = {
-#     'default': {
-#         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-#     },
-# }
+COMMENTS_PER_PAGE = 20
+
+PAGINATOR_COUNT_TIMEOUT = 60
+
+TIMELINE_FANOUT_LIMIT = 1000
+
+TIMELINE_BACKFILL = 100
+
+TIMELINE_BATCH_SIZE = 500
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+PAGE_CACHE_TIMEOUT = 60 * 15
+
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+FOLLOW_GRAPH_CACHE_TIMEOUT = 60 * 60 * 24
+
+SEARCH_MAX_TERMS = 8
+
+SEARCH_MAX_RESULTS = 1000
+
+SEARCH_COMMENT_WEIGHT = 0.5
+
+SEARCH_REBUILD_BATCH_SIZE = 1000
+
+LIVE_BUFFER_SIZE = 1000
+
+LIVE_MAX_CARDS = 20
+
+LIVE_HEARTBEAT_SECONDS = 15
+
+LIVE_STREAM_SECONDS = 5 * 60
+
+LIVE_POLL_TIMEOUT = 25
+
+LIVE_RETRY_MS = 3000
+
+METRICS_SAMPLE_RATE = 0.1
+
+METRICS_ALLOWED_IPS = INTERNAL_IPS
+
+QUERY_LOG_FILE = None
+
+QUERY_LOG_SLOW_MS = 100
+
+QUERY_LOG_REPEAT_THRESHOLD = 5
+
+BENCHMARK_BUDGETS = {
+    'posts:index': {'queries': 3, 'p95_ms': 250, 'memory_kb': 1024},
+    'posts:group_list': {'queries': 4, 'p95_ms': 250, 'memory_kb': 1024},
+    'posts:profile': {'queries': 4, 'p95_ms': 250, 'memory_kb': 1024},
+    'posts:post_detail': {'queries': 3, 'p95_ms': 250, 'memory_kb': 1024},
+    'posts:follow_index': {'queries': 6, 'p95_ms': 250, 'memory_kb': 1024},
+}
+
+FILE_UPLOAD_HANDLERS = [
+    'core.uploadhandlers.MemoryImageUploadHandler',
+    'core.uploadhandlers.TemporaryImageUploadHandler',
+]
+
+UPLOAD_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+
+MEDIA_RELEASE_GRACE_SECONDS = 60 * 60
+
+UPLOAD_REQUEST_MAX_SIZE = UPLOAD_IMAGE_MAX_SIZE + 1024 * 1024
+
+UPLOAD_IMAGE_CONTENT_TYPES = (
+    'image/jpeg',
+    'image/png',
+    'image/gif',
+    'image/webp',
+)
+
+POST_IMAGE_MAX_SIZE = 1920
+
+POST_IMAGE_FORMAT = 'JPEG'
+
+POST_IMAGE_QUALITY = 85
+
+THUMBNAIL_BACKEND = 'core.thumbnails.BackgroundThumbnailBackend'
+
+THUMBNAIL_WORKERS = 2
+
+THUMBNAIL_GEOMETRIES = (
+    ('810x339', {'crop': 'center', 'upscale': True}),
+)
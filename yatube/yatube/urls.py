@@ -4,6 +4,7 @@ from django.contrib import admin
 from django.urls import include, path
 
 from about.apps import AboutConfig
+from core import views as core_views
 from posts.apps import PostsConfig
 from users.apps import UsersConfig
 
@@ -18,6 +19,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls', namespace=UsersConfig.name)),
     path('auth/', include('django.contrib.auth.urls')),
+    path('metrics/', core_views.metrics, name='metrics'),
 ]
 
 if settings.DEBUG: